@@ -2,12 +2,17 @@ from __future__ import annotations
 
 import argparse
 import os
+import sqlite3
+from contextlib import ExitStack
 from pathlib import Path
 
-from .config import BuilderSettings
+from . import config as global_config
+from .config import CACHE_DIR, BuilderSettings
 from .config_loader import load_config, MapMakerConfig
 from .database import PersonaDatabase
 from .llm import build_llm
+from .llm_cache import LLMCache
+from .text_extraction import prune_text_cache
 from .traversal import PersonaBuilder
 
 
@@ -56,6 +61,16 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="After processing, export personas to folder_persona.json files in each directory",
     )
+    parser.add_argument(
+        "--no-llm-cache",
+        action="store_true",
+        help="Always call the LLM instead of reusing cached responses from previous runs",
+    )
+    parser.add_argument(
+        "--no-text-cache",
+        action="store_true",
+        help="Extract text from sampled files every run instead of caching it under the cache directory",
+    )
     parser.add_argument(
         "--stats",
         action="store_true",
@@ -118,8 +133,6 @@ def main() -> None:
             os.environ["OLLAMA_HOST"] = config.llm.host
 
         # Update global config values
-        from . import config as global_config
-
         global_config.MIN_TEXT_FILES = config.processing.min_text_files
         global_config.SAMPLE_LIMIT = config.processing.sample_limit
         global_config.SAMPLE_BYTES = config.processing.sample_bytes
@@ -138,6 +151,12 @@ def main() -> None:
 
     root_path = root_path.resolve()
 
+    # Stub runs are throwaway, so like the LLM cache they leave no cached text behind
+    text_cache = provider != "stub" and not args.no_text_cache
+    if config:
+        text_cache = text_cache and config.processing.text_cache
+    global_config.TEXT_CACHE = text_cache
+
     settings = BuilderSettings(
         root_path=root_path,
         provider=provider,
@@ -149,9 +168,23 @@ def main() -> None:
     db_path = args.db.resolve()
     print(f"Using database: {db_path}")
 
-    with PersonaDatabase(db_path) as db:
-        llm = build_llm(provider)
-        builder = PersonaBuilder(settings=settings, llm=llm, database=db)
+    # Everything opened here is closed on the way out, even if a pass raises
+    with ExitStack() as stack:
+        # Stub output is derived from the prompt itself, so caching it gains nothing
+        llm_cache = None
+        if provider != "stub" and not args.no_llm_cache:
+            try:
+                llm_cache = stack.enter_context(LLMCache(CACHE_DIR / "llm.sqlite"))
+            except (OSError, sqlite3.Error) as e:
+                # The cache only saves repeat calls; a run without it is still correct
+                print(f"Warning: LLM cache unavailable ({e}); continuing without it")
+
+        db = stack.enter_context(PersonaDatabase(db_path))
+        llm = stack.enter_context(build_llm(provider))
+        llm.warm_up()
+        builder = stack.enter_context(
+            PersonaBuilder(settings=settings, llm=llm, database=db, llm_cache=llm_cache)
+        )
 
         print(f"Processing: {root_path}")
         print("\n=== PASS 1: Bottom-Up (Building from children to parent) ===")
@@ -162,6 +195,10 @@ def main() -> None:
         builder.refine_with_parent_constraints(root_path)
         print("Pass 2 complete.")
 
+        embedded = builder.embed_personas(root_path)
+        if embedded:
+            print(f"\nGenerated embeddings for {embedded} folders.")
+
         # Reload root persona after refinement
         persona = db.load_persona(str(root_path))
 
@@ -181,6 +218,9 @@ def main() -> None:
         print("\n=== Root Persona ===")
         print(persona.model_dump_json(indent=2))
 
+    if text_cache:
+        prune_text_cache(global_config.TEXT_CACHE_MAX_AGE_DAYS)
+
 
 if __name__ == "__main__":  # pragma: no cover
     main()
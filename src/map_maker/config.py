@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict
@@ -16,6 +17,8 @@ ROOT_CONSTRAINTS: Dict[str, str] = {
     ),
 }
 
+# The CLI overwrites these module attributes from config.yaml, so other modules read them
+# as config.NAME at call time; a from-import would keep the built-in default
 SCHEMA_VERSION = "1.1"
 DEFAULT_LANGUAGE = "en"
 DEFAULT_CONFIDENCE = 0.82
@@ -23,6 +26,18 @@ DEFAULT_CONFIDENCE = 0.82
 MIN_TEXT_FILES = 5
 SAMPLE_LIMIT = 10
 SAMPLE_BYTES = 2048
+EXTRACT_WORKERS = 8
+# Folders built concurrently by --parallel
+BUILD_WORKERS = 8
+EMBED_BATCH_SIZE = 64
+EMBED_WORKERS = 4
+
+# Caches that must survive a fresh map_maker.db (e.g. LLM responses) live here.
+CACHE_DIR = Path(os.getenv("MAP_MAKER_CACHE_DIR", Path.home() / ".cache" / "map_maker"))
+# Extracted text samples are cached under CACHE_DIR / "text" unless this is off;
+# samples written longer ago than TEXT_CACHE_MAX_AGE_DAYS are pruned after each run
+TEXT_CACHE = True
+TEXT_CACHE_MAX_AGE_DAYS = 90
 
 
 def detect_root_constraint(root_path: Path, current_path: Path) -> str:
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import functools
 import os
 from dataclasses import dataclass
 from pathlib import Path
@@ -7,6 +8,12 @@ from typing import Dict, Optional
 
 import yaml
 
+try:
+    # libyaml-backed parser, several times faster than the pure-Python SafeLoader
+    from yaml import CSafeLoader as _YAMLLoader
+except ImportError:
+    from yaml import SafeLoader as _YAMLLoader
+
 
 @dataclass
 class LLMConfig:
@@ -25,6 +32,7 @@ class ProcessingConfig:
     min_text_files: int = 5
     sample_limit: int = 10
     sample_bytes: int = 2048
+    text_cache: bool = True
 
 
 @dataclass
@@ -60,13 +68,24 @@ class MapMakerConfig:
         }
 
 
+@functools.lru_cache(maxsize=16)
+def _parse_yaml(raw: bytes) -> dict:
+    """
+    Parse config bytes, memoized on the content itself so reloading an unchanged file
+    skips the YAML parser. The result is shared between callers: treat it as read-only.
+    """
+    # Bytes go straight to the parser, which detects and decodes UTF-8 itself
+    return yaml.load(raw, Loader=_YAMLLoader)
+
+
 def load_config(config_path: Path) -> MapMakerConfig:
     """Load configuration from YAML file"""
     if not config_path.exists():
         raise FileNotFoundError(f"Config file not found: {config_path}")
 
-    with open(config_path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+    # Only the parse is cached; the config objects below are rebuilt each call, so
+    # environment lookups (api_key_env) stay live and callers can't share mutations
+    data = _parse_yaml(config_path.read_bytes())
 
     # Parse LLM config
     llm_data = data.get("llm", {})
@@ -85,6 +104,7 @@ def load_config(config_path: Path) -> MapMakerConfig:
         min_text_files=proc_data.get("min_text_files", 5),
         sample_limit=proc_data.get("sample_limit", 10),
         sample_bytes=proc_data.get("sample_bytes", 2048),
+        text_cache=proc_data.get("text_cache", True),
     )
 
     # Parse root constraints
@@ -108,79 +128,48 @@ def load_config(config_path: Path) -> MapMakerConfig:
     return config
 
 
+_DEFAULT_CONFIG_YAML = b"""\
+# Map Maker Configuration File
+# Generated default configuration
+
+# Specify the root path to index
+root_path: /path/to/your/NAS
+
+# LLM Provider Configuration
+llm:
+  # Options: stub, fireworks, ollama
+  provider: stub
+
+  # For Fireworks.ai (uncomment and configure):
+  # api_key_env: FIREWORKS_API_KEY  # reads from environment variable
+  # api_key: your-key-here          # or hardcode (not recommended)
+  # model: accounts/fireworks/models/llama-v3-70b-instruct
+
+  # For Ollama (local LLM, uncomment and configure):
+  # host: http://localhost:11434
+  # model: llama3
+
+# Processing Options
+processing:
+  follow_symlinks: false
+  allow_parallel: false
+  min_text_files: 5
+  sample_limit: 10
+  sample_bytes: 2048
+  text_cache: true
+
+# Semantic Constraints for Root Folders
+root_constraints:
+  business: "Strictly commercial, financial, legal, strategic, and operational content. EXCLUDES: personal, family, domestic, medical, hobby, intimate, or unrelated materials."
+  private: "Strictly personal, family, health, education, hobbies, and private financial documents. EXCLUDES: corporate, client, revenue-generating, or organizational materials."
+
+# Schema Settings
+schema_version: "1.1"
+default_language: en
+default_confidence: 0.82
+"""
+
+
 def create_default_config(output_path: Path) -> None:
     """Create a default config.yaml file"""
-    default_config = {
-        "# Map Maker Configuration": None,
-        "# Specify the root path to index": None,
-        "root_path": "/path/to/your/NAS",
-        "": None,
-        "# LLM Provider Configuration": None,
-        "llm": {
-            "# Options: stub, fireworks, ollama": None,
-            "provider": "stub",
-            "": None,
-            "# For Fireworks.ai": None,
-            "# api_key_env: FIREWORKS_API_KEY  # or hardcode: api_key: your-key-here": None,
-            "# model: accounts/fireworks/models/llama-v3-70b-instruct": None,
-            "  ": None,
-            "# For Ollama (local)": None,
-            "# host: http://localhost:11434": None,
-            "# model: llama3": None,
-        },
-        "  ": None,
-        "# Processing Options": None,
-        "processing": {
-            "follow_symlinks": False,
-            "allow_parallel": False,
-            "min_text_files": 5,
-            "sample_limit": 10,
-            "sample_bytes": 2048,
-        },
-        "   ": None,
-        "# Semantic Constraints": None,
-        "root_constraints": {
-            "business": "Strictly commercial, financial, legal, strategic, and operational content. EXCLUDES: personal, family, domestic, medical, hobby, intimate, or unrelated materials.",
-            "private": "Strictly personal, family, health, education, hobbies, and private financial documents. EXCLUDES: corporate, client, revenue-generating, or organizational materials.",
-        },
-        "    ": None,
-        "# Schema Settings": None,
-        "schema_version": "1.1",
-        "default_language": "en",
-        "default_confidence": 0.82,
-    }
-
-    # Clean up the None values used for comments
-    clean_config = {k: v for k, v in default_config.items() if v is not None and not k.strip() == ""}
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write("# Map Maker Configuration File\n")
-        f.write("# Generated default configuration\n\n")
-        f.write("# Specify the root path to index\n")
-        f.write("root_path: /path/to/your/NAS\n\n")
-        f.write("# LLM Provider Configuration\n")
-        f.write("llm:\n")
-        f.write("  # Options: stub, fireworks, ollama\n")
-        f.write("  provider: stub\n\n")
-        f.write("  # For Fireworks.ai (uncomment and configure):\n")
-        f.write("  # api_key_env: FIREWORKS_API_KEY  # reads from environment variable\n")
-        f.write("  # api_key: your-key-here          # or hardcode (not recommended)\n")
-        f.write("  # model: accounts/fireworks/models/llama-v3-70b-instruct\n\n")
-        f.write("  # For Ollama (local LLM, uncomment and configure):\n")
-        f.write("  # host: http://localhost:11434\n")
-        f.write("  # model: llama3\n\n")
-        f.write("# Processing Options\n")
-        f.write("processing:\n")
-        f.write("  follow_symlinks: false\n")
-        f.write("  allow_parallel: false\n")
-        f.write("  min_text_files: 5\n")
-        f.write("  sample_limit: 10\n")
-        f.write("  sample_bytes: 2048\n\n")
-        f.write("# Semantic Constraints for Root Folders\n")
-        f.write("root_constraints:\n")
-        f.write("  business: \"Strictly commercial, financial, legal, strategic, and operational content. EXCLUDES: personal, family, domestic, medical, hobby, intimate, or unrelated materials.\"\n")
-        f.write("  private: \"Strictly personal, family, health, education, hobbies, and private financial documents. EXCLUDES: corporate, client, revenue-generating, or organizational materials.\"\n\n")
-        f.write("# Schema Settings\n")
-        f.write("schema_version: \"1.1\"\n")
-        f.write("default_language: en\n")
-        f.write("default_confidence: 0.82\n")
+    output_path.write_bytes(_DEFAULT_CONFIG_YAML)
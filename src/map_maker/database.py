@@ -1,26 +1,73 @@
 from __future__ import annotations
 
-import json
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 
-from .schema import FolderPersona
+import pydantic_core
+
+from .schema import FolderPersona, atomic_write_bytes
+
+
+# persona_json embeds every other column, so an identical one means the row is unchanged
+# and is left untouched (no page write, updated_at kept)
+_UPSERT_SQL = """
+    INSERT INTO folder_personas (path, node_type, depth, structural_hash, persona_json)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(path) DO UPDATE SET
+        node_type = excluded.node_type,
+        depth = excluded.depth,
+        structural_hash = excluded.structural_hash,
+        persona_json = excluded.persona_json,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE persona_json IS NOT excluded.persona_json
+"""
+
+PersonaRow = Tuple[str, str, int, Optional[str], str]
 
 
 class PersonaDatabase:
     """SQLite database for storing folder personas"""
 
-    def __init__(self, db_path: Path):
+    def __init__(
+        self,
+        db_path: Path,
+        batch_size: int = 1000,
+        flush_interval: float = 5.0,
+        load_cache_size: int = 4096,
+    ):
         self.db_path = db_path
         self.conn: Optional[sqlite3.Connection] = None
+        # Parallel builds share this connection across worker threads; the lock serializes access
+        self._lock = threading.RLock()
+        # save_persona buffers rows and commits them together once batch_size rows are
+        # pending or flush_interval seconds have passed, bounding what a crash can lose
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, PersonaRow] = {}
+        self._last_flush = time.monotonic()
+        # Recently loaded personas, so folders read again (e.g. a branch's children during
+        # refinement) skip the JSON parse and validation; saves drop the stale entry
+        self._loaded: "OrderedDict[str, FolderPersona]" = OrderedDict()
+        self.load_cache_size = load_cache_size
         self._initialize_db()
 
     def _initialize_db(self) -> None:
         """Create database and tables if they don't exist"""
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row
 
+        # WAL + synchronous=NORMAL: commits append to the log without an fsync each; a crash
+        # can only lose the last commits, never corrupt the file. Needs a local filesystem.
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA mmap_size=268435456")
+        self.conn.execute("PRAGMA cache_size=-65536")
+
         cursor = self.conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS folder_personas (
@@ -35,9 +82,10 @@ class PersonaDatabase:
             )
         """)
 
-        # Create index on path for faster lookups
+        # path is UNIQUE, so SQLite already maintains an index on it for lookups and
+        # ORDER BY path; databases created by older versions carry a redundant copy
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_path ON folder_personas(path)
+            DROP INDEX IF EXISTS idx_path
         """)
 
         # Create index on structural_hash for faster comparison
@@ -48,72 +96,173 @@ class PersonaDatabase:
         self.conn.commit()
 
     def save_persona(self, persona: FolderPersona) -> None:
-        """Save or update a folder persona"""
+        """Save or update a folder persona (buffered; see flush)"""
         if not self.conn:
             raise RuntimeError("Database connection not initialized")
 
-        cursor = self.conn.cursor()
+        row = self._to_row(persona)
+        with self._lock:
+            # Keyed by path: a persona saved twice before a flush is written once
+            self._pending[row[0]] = row
+            self._loaded.pop(row[0], None)
+            if (
+                len(self._pending) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self.flush()
+
+    def save_personas_batch(self, personas: Iterable[FolderPersona]) -> None:
+        """Save or update many personas in a single transaction"""
+        rows = [self._to_row(persona) for persona in personas]
+        with self._lock:
+            for row in rows:
+                # These rows supersede any buffered save of the same folder
+                self._pending.pop(row[0], None)
+                self._loaded.pop(row[0], None)
+            self._write_rows(rows)
+
+    def flush(self) -> None:
+        """Commit all buffered saves"""
+        with self._lock:
+            if self._pending:
+                self._write_rows(list(self._pending.values()))
+                self._pending.clear()
+            self._last_flush = time.monotonic()
+
+    def _write_rows(self, rows: Iterable[PersonaRow]) -> None:
+        if not self.conn:
+            raise RuntimeError("Database connection not initialized")
 
-        persona_json = persona.model_dump_json(indent=2)
+        with self._lock:
+            self.conn.executemany(_UPSERT_SQL, rows)
+            self.conn.commit()
 
-        cursor.execute("""
-            INSERT INTO folder_personas (path, node_type, depth, structural_hash, persona_json)
-            VALUES (?, ?, ?, ?, ?)
-            ON CONFLICT(path) DO UPDATE SET
-                node_type = excluded.node_type,
-                depth = excluded.depth,
-                structural_hash = excluded.structural_hash,
-                persona_json = excluded.persona_json,
-                updated_at = CURRENT_TIMESTAMP
-        """, (
+    @staticmethod
+    def _to_row(persona: FolderPersona) -> PersonaRow:
+        return (
             persona.meta.path,
             persona.meta.node_type.value,
             persona.meta.depth,
             persona.meta.structural_hash,
-            persona_json
-        ))
-
-        self.conn.commit()
+            # Compact in the database; export_to_json_files pretty-prints for the files on disk
+            persona.model_dump_json(),
+        )
 
     def load_persona(self, path: str) -> Optional[FolderPersona]:
-        """Load a folder persona by path"""
+        """
+        Load a folder persona by path.
+        Repeated loads may return the same instance; copy it before mutating.
+        """
         if not self.conn:
             raise RuntimeError("Database connection not initialized")
 
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT persona_json FROM folder_personas WHERE path = ?
-        """, (path,))
-
-        row = cursor.fetchone()
-        if not row:
-            return None
+        with self._lock:
+            cached = self._loaded.get(path)
+            if cached is not None:
+                self._loaded.move_to_end(path)
+                return cached
+
+            pending = self._pending.get(path)
+            if pending is not None:
+                persona_json = pending[4]
+            else:
+                cursor = self.conn.cursor()
+                cursor.execute("""
+                    SELECT persona_json FROM folder_personas WHERE path = ?
+                """, (path,))
+
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                persona_json = row["persona_json"]
+
+            return self._remember(path, persona_json)
+
+    def load_personas(self, paths: Iterable[str]) -> Dict[str, FolderPersona]:
+        """
+        Load several folder personas at once; paths without a stored persona are left out.
+        Rows not already cached or pending are fetched with one IN query per chunk.
+        """
+        if not self.conn:
+            raise RuntimeError("Database connection not initialized")
 
+        found: Dict[str, FolderPersona] = {}
+        with self._lock:
+            missing: list[str] = []
+            for path in paths:
+                cached = self._loaded.get(path)
+                if cached is not None:
+                    self._loaded.move_to_end(path)
+                    found[path] = cached
+                elif path in self._pending:
+                    persona = self._remember(path, self._pending[path][4])
+                    if persona is not None:
+                        found[path] = persona
+                else:
+                    missing.append(path)
+
+            cursor = self.conn.cursor()
+            # Stay under SQLite's bound-parameter limit on older builds (999)
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT path, persona_json FROM folder_personas WHERE path IN ({placeholders})",
+                    chunk,
+                )
+                for row in cursor.fetchall():
+                    persona = self._remember(row["path"], row["persona_json"])
+                    if persona is not None:
+                        found[row["path"]] = persona
+        return found
+
+    def _remember(self, path: str, persona_json: str) -> Optional[FolderPersona]:
+        """Validate a stored row and keep it in the load cache; caller holds the lock"""
         try:
-            data = json.loads(row["persona_json"])
-            return FolderPersona.model_validate(data)
+            # Parsed and validated in one pass by pydantic-core, without an intermediate dict
+            persona = FolderPersona.model_validate_json(persona_json)
         except Exception:
             return None
 
+        self._loaded[path] = persona
+        if len(self._loaded) > self.load_cache_size:
+            self._loaded.popitem(last=False)
+        return persona
+
     def get_all_personas(self) -> list[FolderPersona]:
         """Get all folder personas from the database"""
-        if not self.conn:
-            raise RuntimeError("Database connection not initialized")
+        return list(self.iter_personas())
 
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT persona_json FROM folder_personas ORDER BY path
-        """)
-
-        personas = []
-        for row in cursor.fetchall():
+    def iter_personas(self, batch_size: int = 500) -> Iterator[FolderPersona]:
+        """
+        Yield all folder personas ordered by path, fetching rows in batches
+        so memory stays flat regardless of how many folders are stored.
+        """
+        for _, persona_json in self.iter_persona_json(batch_size):
             try:
-                data = json.loads(row["persona_json"])
-                personas.append(FolderPersona.model_validate(data))
+                yield FolderPersona.model_validate_json(persona_json)
             except Exception:
                 continue
 
-        return personas
+    def iter_persona_json(self, batch_size: int = 500) -> Iterator[Tuple[str, str]]:
+        """Yield (path, stored persona JSON) rows ordered by path, without parsing them"""
+        if not self.conn:
+            raise RuntimeError("Database connection not initialized")
+
+        with self._lock:
+            self.flush()
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT path, persona_json FROM folder_personas ORDER BY path
+            """)
+
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row["path"], row["persona_json"]
 
     def export_to_json_files(self, base_path: Optional[Path] = None) -> int:
         """
@@ -123,18 +272,19 @@ class PersonaDatabase:
         if not self.conn:
             raise RuntimeError("Database connection not initialized")
 
-        personas = self.get_all_personas()
         written_count = 0
 
-        for persona in personas:
+        # Rows already hold the serialized persona: re-indent them with pydantic-core (the same
+        # serializer as FolderPersona.write, so the files match) instead of re-validating each one
+        for path, persona_json in self.iter_persona_json():
             try:
-                folder_path = Path(persona.meta.path)
-                if base_path and not str(folder_path).startswith(str(base_path)):
+                if base_path and not path.startswith(str(base_path)):
                     continue
 
-                output_path = folder_path / "folder_persona.json"
+                output_path = Path(path) / "folder_persona.json"
                 output_path.parent.mkdir(parents=True, exist_ok=True)
-                persona.write(output_path)
+                pretty = pydantic_core.to_json(pydantic_core.from_json(persona_json), indent=2)
+                atomic_write_bytes(output_path, pretty)
                 written_count += 1
             except Exception:
                 # Skip if we can't write to this location
@@ -147,16 +297,18 @@ class PersonaDatabase:
         if not self.conn:
             raise RuntimeError("Database connection not initialized")
 
-        cursor = self.conn.cursor()
+        with self._lock:
+            self.flush()
+            cursor = self.conn.cursor()
 
-        cursor.execute("SELECT COUNT(*) as total FROM folder_personas")
-        total = cursor.fetchone()["total"]
+            cursor.execute("SELECT COUNT(*) as total FROM folder_personas")
+            total = cursor.fetchone()["total"]
 
-        cursor.execute("SELECT COUNT(DISTINCT node_type) as types FROM folder_personas")
-        types = cursor.fetchone()["types"]
+            cursor.execute("SELECT COUNT(DISTINCT node_type) as types FROM folder_personas")
+            types = cursor.fetchone()["types"]
 
-        cursor.execute("SELECT node_type, COUNT(*) as count FROM folder_personas GROUP BY node_type")
-        by_type = {row["node_type"]: row["count"] for row in cursor.fetchall()}
+            cursor.execute("SELECT node_type, COUNT(*) as count FROM folder_personas GROUP BY node_type")
+            by_type = {row["node_type"]: row["count"] for row in cursor.fetchall()}
 
         return {
             "total_folders": total,
@@ -165,8 +317,9 @@ class PersonaDatabase:
         }
 
     def close(self) -> None:
-        """Close the database connection"""
+        """Flush buffered saves and close the database connection"""
         if self.conn:
+            self.flush()
             self.conn.close()
             self.conn = None
 
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
+import functools
+import importlib.util
 import os
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 
-import httpx
 from pydantic import BaseModel
 
-try:
-    from fireworks import LLM as FireworksLLM_SDK
-    FIREWORKS_AVAILABLE = True
-except ImportError:
-    FIREWORKS_AVAILABLE = False
+# The SDK (and httpx) are imported when a provider is built, so the stub provider doesn't pay for them
+FIREWORKS_AVAILABLE = importlib.util.find_spec("fireworks") is not None
+
+
+@functools.lru_cache(maxsize=64)
+def _schema_for(cls: type[BaseModel]) -> Dict:
+    """JSON schema of a response model, generated once per class"""
+    return cls.model_json_schema()
 
 
 @dataclass
@@ -21,11 +25,29 @@ class LLMResponse:
 
 
 class BaseLLM:
+    # Upper bound on concurrent generate() calls during a parallel build
+    max_concurrency = 8
+
     def generate(self, system_prompt: str, user_prompt: str, response_schema: Optional[type[BaseModel]] = None) -> LLMResponse:  # pragma: no cover - interface
         raise NotImplementedError
 
+    def warm_up(self) -> None:
+        """Prepare the backend before the first real request; no-op by default"""
+
+    def close(self) -> None:
+        """Release pooled connections; no-op by default"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
 
 class FireworksLLM(BaseLLM):
+    # Hosted API: round-trip latency dominates, so keep many requests in flight
+    max_concurrency = 20
+
     def __init__(self, model: str = "llama4-maverick-instruct-basic"):
         if not FIREWORKS_AVAILABLE:
             raise RuntimeError("fireworks-ai package not installed. Run: pip install fireworks-ai")
@@ -37,6 +59,8 @@ class FireworksLLM(BaseLLM):
 
         model_name = os.getenv("FIREWORKS_MODEL", model)
 
+        from fireworks import LLM as FireworksLLM_SDK
+
         # Initialize LLM with deployment_type="auto" and explicit api_key
         self.client = FireworksLLM_SDK(
             model=model_name,
@@ -47,6 +71,17 @@ class FireworksLLM(BaseLLM):
 
         # Embedding model
         self.embedding_model = "nomic-ai/nomic-embed-text-v1.5"
+        import httpx
+
+        # Pooled client so embedding batches reuse one keep-alive TLS connection
+        self._http = httpx.Client(
+            base_url="https://api.fireworks.ai/inference/v1",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=30.0,
+        )
 
     def generate(self, system_prompt: str, user_prompt: str, response_schema: Optional[type[BaseModel]] = None) -> LLMResponse:
         try:
@@ -64,7 +99,7 @@ class FireworksLLM(BaseLLM):
                     "type": "json_schema",
                     "json_schema": {
                         "name": response_schema.__name__,
-                        "schema": response_schema.model_json_schema()
+                        "schema": _schema_for(response_schema)
                     }
                 }
 
@@ -76,31 +111,63 @@ class FireworksLLM(BaseLLM):
 
     def generate_embedding(self, text: str) -> Optional[List[float]]:
         """Generate embedding vector for semantic search"""
+        return self.generate_embeddings([text])[0]
+
+    def generate_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Generate embedding vectors for several texts in one API round trip"""
+        if not texts:
+            return []
         try:
-            response = httpx.post(
-                "https://api.fireworks.ai/inference/v1/embeddings",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
+            response = self._http.post(
+                "/embeddings",
                 json={
                     "model": self.embedding_model,
-                    "input": text,
+                    "input": texts,
                 },
-                timeout=30.0,
             )
             response.raise_for_status()
             data = response.json()
-            return data["data"][0]["embedding"]
+            # Items carry their input position; don't rely on response order
+            items = sorted(data["data"], key=lambda item: item.get("index", 0))
+            return [item["embedding"] for item in items]
         except Exception as e:
-            print(f"Warning: Failed to generate embedding: {e}")
-            return None
+            print(f"Warning: Failed to generate embeddings: {e}")
+            return [None] * len(texts)
+
+    def close(self) -> None:
+        self._http.close()
 
 
 class OllamaLLM(BaseLLM):
+    # How long the server keeps the model loaded between requests
+    KEEP_ALIVE = "10m"
+    # A single local server: more parallel requests only queue or thrash the GPU
+    max_concurrency = 4
+
     def __init__(self, model: str = "llama3"):
         self.host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
         self.model = os.getenv("OLLAMA_MODEL", model)
+        import httpx
+
+        # One pooled client so consecutive folders reuse the same keep-alive connection
+        self._http = httpx.Client(
+            base_url=self.host,
+            headers={"Content-Type": "application/json"},
+            timeout=30.0,
+        )
+
+    def warm_up(self) -> None:
+        """Ask the server to load the model now so the first folder doesn't pay the cold start"""
+        try:
+            # A generate request without a prompt only loads the model into memory
+            response = self._http.post(
+                "/api/generate",
+                json={"model": self.model, "keep_alive": self.KEEP_ALIVE},
+                timeout=300.0,
+            )
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Warning: Failed to warm up Ollama model {self.model}: {e}")
 
     def generate(self, system_prompt: str, user_prompt: str, response_schema: Optional[type[BaseModel]] = None) -> LLMResponse:
         payload = {
@@ -110,18 +177,17 @@ class OllamaLLM(BaseLLM):
                 {"role": "user", "content": user_prompt},
             ],
             "stream": False,
+            "keep_alive": self.KEEP_ALIVE,
         }
-        response = httpx.post(
-            f"{self.host}/api/chat",
-            headers={"Content-Type": "application/json"},
-            json=payload,
-            timeout=30.0,
-        )
+        response = self._http.post("/api/chat", json=payload)
         response.raise_for_status()
         data = response.json()
         message = data.get("message", {}).get("content", "")
         return LLMResponse(content=message, model=self.model)
 
+    def close(self) -> None:
+        self._http.close()
+
 
 class StubLLM(BaseLLM):
     def generate(self, system_prompt: str, user_prompt: str, response_schema: Optional[type[BaseModel]] = None) -> LLMResponse:
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from typing import List, Optional
+
+
+def build_cache_key(model: str, system_prompt: str, user_prompt: str) -> str:
+    """Stable cache key for a single chat completion request"""
+    payload = f"{model}\0{system_prompt}\0{user_prompt}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_embedding_key(model: str, text: str) -> str:
+    """Stable cache key for the embedding of a single text"""
+    payload = f"{model}\0{text}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Persistent SQLite cache of LLM responses and embeddings keyed by (model, input)"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._initialize_db()
+
+    def _initialize_db(self) -> None:
+        """Create cache database and table if they don't exist"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Shared by the worker threads of a parallel build; access is serialized by self._lock
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # Every response is committed as it arrives; WAL keeps those commits cheap
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                ts INTEGER DEFAULT (strftime('%s', 'now'))
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                embedding BLOB NOT NULL,
+                ts INTEGER DEFAULT (strftime('%s', 'now'))
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss"""
+        if not self.conn:
+            raise RuntimeError("Cache connection not initialized")
+
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """Store a response, replacing any previous entry for key"""
+        if not self.conn:
+            raise RuntimeError("Cache connection not initialized")
+
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response) VALUES (?, ?, ?)",
+                (key, model, response),
+            )
+            self.conn.commit()
+
+    def get_embedding(self, key: str) -> Optional[List[float]]:
+        """Return the cached embedding for key, or None on a miss"""
+        if not self.conn:
+            raise RuntimeError("Cache connection not initialized")
+
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT embedding FROM embedding_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if not row:
+            return None
+        vector = array("d")
+        vector.frombytes(row[0])
+        return vector.tolist()
+
+    def put_embedding(self, key: str, model: str, embedding: List[float]) -> None:
+        """Store an embedding, replacing any previous entry for key"""
+        if not self.conn:
+            raise RuntimeError("Cache connection not initialized")
+
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO embedding_cache (key, model, embedding) VALUES (?, ?, ?)",
+                # Packed float64: loads are a memcpy instead of parsing decimal text
+                (key, model, array("d", embedding).tobytes()),
+            )
+            self.conn.commit()
+
+    def close(self) -> None:
+        """Close the cache connection"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,12 +1,25 @@
 from __future__ import annotations
 
+import os
+import threading
 from enum import Enum
 from pathlib import Path
 from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
-from .config import DEFAULT_CONFIDENCE, DEFAULT_LANGUAGE, SCHEMA_VERSION
+from . import config as global_config
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write via a temporary file and an atomic rename, so readers never see a partial file"""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
 
 
 class NodeType(str, Enum):
@@ -18,8 +31,9 @@ class Meta(BaseModel):
     path: str
     node_type: NodeType
     depth: int
-    language: str = DEFAULT_LANGUAGE
-    confidence: float = DEFAULT_CONFIDENCE
+    # Factories, so values the CLI loads from config.yaml apply to personas built afterwards
+    language: str = Field(default_factory=lambda: global_config.DEFAULT_LANGUAGE)
+    confidence: float = Field(default_factory=lambda: global_config.DEFAULT_CONFIDENCE)
     structural_hash: Optional[str] = None
 
 
@@ -49,7 +63,7 @@ class Audit(BaseModel):
 
 
 class FolderPersona(BaseModel):
-    schema_version: str = SCHEMA_VERSION
+    schema_version: str = Field(default_factory=lambda: global_config.SCHEMA_VERSION)
     meta: Meta
     constraints: Constraints
     persona: Persona
@@ -57,8 +71,8 @@ class FolderPersona(BaseModel):
     audit: Audit = Field(default_factory=Audit)
 
     def write(self, path: Path) -> None:
-        path.write_text(self.model_dump_json(indent=2), encoding="utf-8")
+        atomic_write_bytes(path, self.model_dump_json(indent=2).encode("utf-8"))
 
     @classmethod
     def from_file(cls, path: Path) -> "FolderPersona":
-        return cls.model_validate_json(path.read_text(encoding="utf-8"))
+        return cls.model_validate_json(path.read_bytes())
@@ -1,18 +1,35 @@
 from __future__ import annotations
 
+import hashlib
+import importlib.util
+import itertools
 import mimetypes
+import os
+import shutil
+import subprocess
+import threading
+import time
 import xml.etree.ElementTree as ET
 import zipfile
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
 
-from docx import Document
-from pptx import Presentation
-from pypdf import PdfReader
+from . import config as global_config
+from .config import CACHE_DIR
 
-from .config import SAMPLE_BYTES
+# Document libraries are imported inside their readers: they are slow to import and
+# unused by runs (or cli paths like --help) that never meet such a file
+PDFIUM_AVAILABLE = importlib.util.find_spec("pypdfium2") is not None
 
-TEXT_EXTENSIONS = {
+# poppler's pdftotext runs out of process, so concurrent PDF samples don't share a lock
+PDFTOTEXT = shutil.which("pdftotext")
+
+# Extracted text, keyed by file identity, so unchanged files are never parsed twice
+TEXT_CACHE_DIR = CACHE_DIR / "text"
+# Part of every cache key: bump it when a reader's output changes so older samples are ignored
+TEXT_CACHE_VERSION = 2
+
+TEXT_EXTENSIONS = frozenset({
     ".txt",
     ".md",
     ".rtf",
@@ -30,60 +47,223 @@ TEXT_EXTENSIONS = {
     ".css",
     ".xml",
     ".xmind",
-}
+})
+
+PDF_MIME = frozenset({"application/pdf"})
+DOCX_MIME = frozenset({"application/vnd.openxmlformats-officedocument.wordprocessingml.document"})
+PPTX_MIME = frozenset({"application/vnd.openxmlformats-officedocument.presentationml.presentation"})
+
+
+def _build_textual_suffixes() -> frozenset:
+    """Every suffix is_textual accepts, resolved once from the mimetypes database"""
+    if not mimetypes.inited:
+        mimetypes.init()
+    suffixes = set(TEXT_EXTENSIONS) | {".pptx", ".ppt"}
+    for suffix, mime in mimetypes.types_map.items():
+        if mime.startswith("text/") or mime in PDF_MIME or mime in DOCX_MIME or mime in PPTX_MIME:
+            suffixes.add(suffix.lower())
+    return frozenset(suffixes)
+
 
-PDF_MIME = {"application/pdf"}
-DOCX_MIME = {"application/vnd.openxmlformats-officedocument.wordprocessingml.document"}
-PPTX_MIME = {"application/vnd.openxmlformats-officedocument.presentationml.presentation"}
+# Checked for every file in the tree, so a set lookup replaces mimetypes.guess_type
+_TEXTUAL_SUFFIXES = _build_textual_suffixes()
 
 
 def is_textual(path: Path) -> bool:
-    if path.suffix.lower() in TEXT_EXTENSIONS:
-        return True
-    if path.suffix.lower() in {".pptx", ".ppt"}:
-        return True
-    mime, _ = mimetypes.guess_type(path)
-    return bool(mime and (mime.startswith("text/") or mime in PDF_MIME or mime in DOCX_MIME or mime in PPTX_MIME))
+    return path.suffix.lower() in _TEXTUAL_SUFFIXES
 
 
 def read_text_file(path: Path) -> str:
-    try:
-        return path.read_text(encoding="utf-8", errors="ignore")[:SAMPLE_BYTES]
-    except UnicodeDecodeError:
-        return path.read_text(encoding="latin-1", errors="ignore")[:SAMPLE_BYTES]
+    # read(n) on a text stream stops after n characters, so huge logs/CSVs are never loaded whole.
+    # errors="ignore" drops undecodable bytes, so this never raises UnicodeDecodeError.
+    with path.open(encoding="utf-8", errors="ignore") as handle:
+        return handle.read(global_config.SAMPLE_BYTES)
+
+
+def _take_sample(parts: Iterable[str]) -> str:
+    """Join parts with newlines, consuming only as many as are needed to fill SAMPLE_BYTES"""
+    limit = global_config.SAMPLE_BYTES
+    collected = []
+    length = 0
+    for part in parts:
+        collected.append(part)
+        length += len(part) + 1
+        if length > limit:
+            break
+    return "\n".join(collected)[:limit]
+
+
+# PDFium is not thread-safe, and leaf samples are extracted on a thread pool
+_PDFIUM_LOCK = threading.Lock()
 
 
 def read_pdf(path: Path) -> str:
-    reader = PdfReader(path)
-    pages = []
-    for page in reader.pages[:3]:
-        text = page.extract_text() or ""
-        pages.append(text)
-    return "\n".join(pages)[:SAMPLE_BYTES]
+    if PDFTOTEXT:
+        try:
+            return read_pdf_pdftotext(path)
+        except (OSError, subprocess.SubprocessError):
+            pass  # Fall back to the in-process readers
+    if PDFIUM_AVAILABLE:
+        return read_pdf_pdfium(path)
+    from pypdf import PdfReader
+
+    # Given a path, pypdf reads the whole file into memory; an open file is only read
+    # where the xref and the sampled pages point
+    with path.open("rb") as handle:
+        reader = PdfReader(handle)
+        # Pages are parsed lazily, so a full sample from page 1 skips parsing the rest
+        return _take_sample(reader.pages[i].extract_text() or "" for i in range(min(3, len(reader.pages))))
+
+
+def read_pdf_pdftotext(path: Path) -> str:
+    """Extract the first pages with the pdftotext binary"""
+    result = subprocess.run(
+        [PDFTOTEXT, "-l", "3", "-enc", "UTF-8", "-nopgbrk", str(path), "-"],
+        capture_output=True,
+        timeout=30,
+        check=True,
+    )
+    return result.stdout.decode("utf-8", errors="replace")[:global_config.SAMPLE_BYTES]
+
+
+def read_pdf_pdfium(path: Path) -> str:
+    """Extract the first pages with PDFium (C++), much faster than pure-Python pypdf"""
+    import pypdfium2 as pdfium
+
+    with _PDFIUM_LOCK:
+        document = pdfium.PdfDocument(path)
+
+        def page_texts():
+            for index in range(min(3, len(document))):
+                page = document[index]
+                textpage = page.get_textpage()
+                text = textpage.get_text_range().replace("\r\n", "\n")
+                textpage.close()
+                page.close()
+                yield text
+
+        try:
+            return _take_sample(page_texts())
+        finally:
+            document.close()
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DOCX_BODY, _DOCX_P, _DOCX_R, _DOCX_HYPERLINK = f"{_W}body", f"{_W}p", f"{_W}r", f"{_W}hyperlink"
+# Run children and their text, as python-docx renders them (w:t is its own text)
+_DOCX_RUN_TEXT = {f"{_W}tab": "\t", f"{_W}ptab": "\t", f"{_W}cr": "\n", f"{_W}noBreakHyphen": "-"}
+_DOCX_T, _DOCX_BR = f"{_W}t", f"{_W}br"
+_OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+
+def _docx_main_part(archive: zipfile.ZipFile) -> str:
+    """Name of the main document part, as declared by the package relationships"""
+    try:
+        rels = ET.fromstring(archive.read("_rels/.rels"))
+    except KeyError:
+        return "word/document.xml"
+    for rel in rels:
+        if rel.get("Type") == _OFFICE_DOCUMENT_REL:
+            return rel.get("Target", "").lstrip("/")
+    return "word/document.xml"
+
+
+def _docx_paragraph_texts(handle) -> Iterator[str]:
+    """
+    Yield the text of each body paragraph (runs, including those in hyperlinks), streaming
+    the XML so the parse stops once the sample is full and finished elements are freed.
+    """
+    open_tags: List[str] = []
+    open_elements: List[ET.Element] = []
+    parts: List[str] = []
+    for event, element in ET.iterparse(handle, events=("start", "end")):
+        if event == "start":
+            open_tags.append(element.tag)
+            open_elements.append(element)
+            continue
+
+        tag = element.tag
+        # Run content counts when its run sits in a body paragraph, directly or in a hyperlink
+        in_body_run = False
+        if len(open_tags) >= 5 and open_tags[-2] == _DOCX_R:
+            paragraph_at = -4 if open_tags[-3] == _DOCX_HYPERLINK else -3
+            # The body must sit under a document root, whichever depth the run is at
+            in_body_run = (
+                len(open_tags) >= 2 - paragraph_at
+                and open_tags[paragraph_at] == _DOCX_P
+                and open_tags[paragraph_at - 1] == _DOCX_BODY
+            )
+        if in_body_run:
+            if tag == _DOCX_T:
+                parts.append(element.text or "")
+            elif tag == _DOCX_BR:
+                # Page and column breaks have no text equivalent
+                if element.get(f"{_W}type", "textWrapping") == "textWrapping":
+                    parts.append("\n")
+            elif tag in _DOCX_RUN_TEXT:
+                parts.append(_DOCX_RUN_TEXT[tag])
+        elif tag == _DOCX_P and len(open_tags) >= 2 and open_tags[-2] == _DOCX_BODY:
+            yield "".join(parts)
+            parts.clear()
+
+        open_tags.pop()
+        open_elements.pop()
+        element.clear()
+        if open_elements:
+            open_elements[-1].remove(element)
 
 
 def read_docx(path: Path) -> str:
-    document = Document(path)
-    paragraphs = [p.text for p in document.paragraphs]
-    return "\n".join(paragraphs)[:SAMPLE_BYTES]
+    """Extract body paragraphs by streaming the document XML, without building python-docx objects"""
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(_docx_main_part(archive)) as handle:
+            return _take_sample(_docx_paragraph_texts(handle))
 
 
 def read_pptx(path: Path) -> str:
     """Extract text content from PowerPoint files"""
+    from pptx import Presentation
+
     presentation = Presentation(path)
-    text_parts = []
 
-    for slide in presentation.slides:
-        # Extract title
-        if slide.shapes.title:
-            text_parts.append(slide.shapes.title.text)
+    def slide_texts():
+        for slide in presentation.slides:
+            # Extract title
+            if slide.shapes.title:
+                yield slide.shapes.title.text
 
-        # Extract text from all text boxes
-        for shape in slide.shapes:
-            if hasattr(shape, "text") and shape.text:
-                text_parts.append(shape.text)
+            # Extract text from all text boxes
+            for shape in slide.shapes:
+                if hasattr(shape, "text") and shape.text:
+                    yield shape.text
 
-    return "\n".join(text_parts)[:SAMPLE_BYTES]
+    return _take_sample(slide_texts())
+
+
+def _xml_topic_texts(handle) -> Iterator[str]:
+    """
+    Yield title attributes and element text in document order, streaming the XML so the
+    parse stops once the sample is full and finished elements are freed as it goes.
+    """
+    # An element's text is only known at the next event, so it is emitted then
+    open_elements: List[ET.Element] = []
+    awaiting_text: Optional[ET.Element] = None
+    for event, element in ET.iterparse(handle, events=("start", "end")):
+        if awaiting_text is not None:
+            # XMind uses 'topic' elements with 'title' attributes; also take text content
+            if awaiting_text.text and awaiting_text.text.strip():
+                yield awaiting_text.text.strip()
+            awaiting_text = None
+        if event == "start":
+            if 'title' in element.attrib:
+                yield element.attrib['title']
+            open_elements.append(element)
+            awaiting_text = element
+        else:
+            open_elements.pop()
+            element.clear()
+            if open_elements:
+                open_elements[-1].remove(element)
 
 
 def read_xmind(path: Path) -> str:
@@ -92,71 +272,145 @@ def read_xmind(path: Path) -> str:
         with zipfile.ZipFile(path, 'r') as zip_ref:
             # XMind files contain content.xml or content.json
             if 'content.xml' in zip_ref.namelist():
-                content = zip_ref.read('content.xml').decode('utf-8', errors='ignore')
-                # Parse XML and extract topic titles
-                root = ET.fromstring(content)
-                topics = []
-
-                # Extract all topic titles (XMind uses 'topic' elements with 'title' attributes)
-                for topic in root.iter():
-                    if 'title' in topic.attrib:
-                        topics.append(topic.attrib['title'])
-                    # Also check for text content in elements
-                    if topic.text and topic.text.strip():
-                        topics.append(topic.text.strip())
-
-                return "\n".join(topics)[:SAMPLE_BYTES]
+                with zip_ref.open('content.xml') as handle:
+                    return _take_sample(_xml_topic_texts(handle))
             elif 'content.json' in zip_ref.namelist():
                 # Newer XMind versions use JSON
                 import json
                 content = zip_ref.read('content.json').decode('utf-8', errors='ignore')
                 data = json.loads(content)
-                topics = []
-
-                def extract_topics(node):
-                    if isinstance(node, dict):
-                        if 'title' in node:
-                            topics.append(node['title'])
-                        for value in node.values():
-                            extract_topics(value)
-                    elif isinstance(node, list):
-                        for item in node:
-                            extract_topics(item)
-
-                extract_topics(data)
-                return "\n".join(topics)[:SAMPLE_BYTES]
+
+                def extract_topics():
+                    # Pre-order walk with an explicit stack: deep maps can't hit the recursion
+                    # limit, and _take_sample stops it once the sample is full
+                    stack = [data]
+                    while stack:
+                        node = stack.pop()
+                        if isinstance(node, dict):
+                            if 'title' in node:
+                                yield node['title']
+                            stack.extend(reversed(list(node.values())))
+                        elif isinstance(node, list):
+                            stack.extend(reversed(node))
+
+                return _take_sample(extract_topics())
     except Exception:
         pass
     return ""
 
 
+# Suffix -> extractor; anything else is read as plain text.
+# Every reader returns at most SAMPLE_BYTES characters.
+READERS: Dict[str, Callable[[Path], str]] = {
+    ".pdf": read_pdf,
+    ".docx": read_docx,
+    ".doc": read_docx,
+    ".pptx": read_pptx,
+    ".ppt": read_pptx,
+    ".xmind": read_xmind,
+}
+
+
+def _reader_tag(suffix: str) -> str:
+    """Name the reader that handles `suffix` here, so installing a better one invalidates old samples"""
+    if suffix == ".pdf":
+        if PDFTOTEXT:
+            return "pdftotext"
+        return "pdfium" if PDFIUM_AVAILABLE else "pypdf"
+    return READERS.get(suffix, read_text_file).__name__
+
+
+def _text_cache_path(path: Path, stat: os.stat_result) -> Path:
+    identity = (
+        f"{path.absolute()}|{stat.st_mtime_ns}|{stat.st_size}|{global_config.SAMPLE_BYTES}"
+        f"|{_reader_tag(path.suffix.lower())}|{TEXT_CACHE_VERSION}"
+    )
+    key = hashlib.sha1(identity.encode("utf-8", errors="surrogateescape")).hexdigest()
+    return TEXT_CACHE_DIR / key[:2] / f"{key}.txt"
+
+
 def safe_extract(path: Path) -> Tuple[str, List[str]]:
+    """Extract a text sample, reusing the on-disk cache while the file is unchanged"""
+    if not global_config.TEXT_CACHE:
+        return _extract_uncached(path)
+    try:
+        cache_path: Optional[Path] = _text_cache_path(path, path.stat())
+    except OSError:
+        cache_path = None
+
+    if cache_path is not None:
+        try:
+            return cache_path.read_bytes().decode("utf-8", errors="surrogatepass"), []
+        except OSError:
+            pass
+
+    text, errors = _extract_uncached(path)
+    # Only clean extractions are cached, so failures are retried on the next run
+    if cache_path is not None and not errors:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(text.encode("utf-8", errors="surrogatepass"))
+            os.replace(tmp_path, cache_path)
+        except (OSError, UnicodeError):
+            pass
+    return text, errors
+
+
+def prune_text_cache(max_age_days: float) -> int:
+    """Delete cached samples written more than `max_age_days` ago; returns how many were removed"""
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    try:
+        with os.scandir(TEXT_CACHE_DIR) as entries:
+            buckets = [entry.path for entry in entries if entry.is_dir()]
+    except OSError:
+        return 0
+    for bucket in buckets:
+        try:
+            with os.scandir(bucket) as entries:
+                for entry in entries:
+                    try:
+                        if entry.stat().st_mtime < cutoff:
+                            os.remove(entry.path)
+                            removed += 1
+                    except OSError:
+                        pass  # Gone already, or written by a concurrent run
+        except OSError:
+            pass
+    return removed
+
+
+def _extract_uncached(path: Path) -> Tuple[str, List[str]]:
     errors: List[str] = []
     text = ""
+    reader = READERS.get(path.suffix.lower(), read_text_file)
     try:
-        if path.suffix.lower() == ".pdf":
-            text = read_pdf(path)
-        elif path.suffix.lower() in {".docx", ".doc"}:
-            text = read_docx(path)
-        elif path.suffix.lower() in {".pptx", ".ppt"}:
-            text = read_pptx(path)
-        elif path.suffix.lower() == ".xmind":
-            text = read_xmind(path)
-        else:
-            text = read_text_file(path)
+        text = reader(path)
     except Exception as exc:  # pylint: disable=broad-except
         errors.append(f"Failed to read {path.name}: {exc}")
-    return text[:SAMPLE_BYTES], errors
+    return text, errors
 
 
-def sample_files(files: Iterable[Path], limit: int) -> List[Path]:
-    candidates = sorted(files, key=lambda p: p.stat().st_mtime)
+def sample_files(
+    files: Iterable[Path], limit: int, mtimes: Optional[Mapping[Path, float]] = None
+) -> List[Path]:
+    """
+    Pick up to `limit` files: the 3 oldest, the 3 newest and evenly spaced picks between.
+    `mtimes` can supply modification times already captured while listing the directory,
+    saving a stat() per file.
+    """
+    if mtimes is not None:
+        candidates = sorted(files, key=mtimes.__getitem__)
+    else:
+        candidates = sorted(files, key=lambda p: p.stat().st_mtime)
     if len(candidates) <= limit:
         return candidates
 
     oldest = candidates[:3]
     newest = candidates[-3:]
-    remaining_pool = [f for f in candidates if f not in oldest + newest]
+    # candidates are sorted and unique, so the middle set is just the slice between them
+    remaining_pool = candidates[3:-3]
 
     remaining_needed = max(0, limit - len(oldest) - len(newest))
     sampled: List[Path] = []
@@ -166,5 +420,13 @@ def sample_files(files: Iterable[Path], limit: int) -> List[Path]:
             pick_index = min(idx * stride, len(remaining_pool) - 1)
             sampled.append(remaining_pool[pick_index])
 
-    combined = list(dict.fromkeys(oldest + sampled + newest))
-    return combined[:limit]
+    # Picks can repeat (clamped strides, or oldest/newest overlapping in tiny folders)
+    combined: List[Path] = []
+    seen = set()
+    for candidate in itertools.chain(oldest, sampled, newest):
+        if len(combined) >= limit:
+            break
+        if candidate not in seen:
+            seen.add(candidate)
+            combined.append(candidate)
+    return combined
@@ -2,22 +2,28 @@ from __future__ import annotations
 
 import hashlib
 import json
-from concurrent.futures import ThreadPoolExecutor, wait
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, List, Optional, Set, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 
 from pydantic import BaseModel, Field, ValidationError
 
+from . import config as global_config
 from .config import (
-    DEFAULT_CONFIDENCE,
-    MIN_TEXT_FILES,
-    SAMPLE_LIMIT,
+    BUILD_WORKERS,
+    EMBED_BATCH_SIZE,
+    EMBED_WORKERS,
+    EXTRACT_WORKERS,
     BuilderSettings,
     build_path_context,
     detect_root_constraint,
 )
 from .database import PersonaDatabase
-from .llm import BaseLLM, safe_generate
+from .llm import BaseLLM, LLMResponse, safe_generate
+from .llm_cache import LLMCache, build_cache_key, build_embedding_key
 
 from .schema import Constraints, FolderPersona, Meta, NodeType, Persona, VectorData
 from .text_extraction import is_textual, safe_extract, sample_files
@@ -76,31 +82,144 @@ CRITICAL: You MUST return ONLY valid JSON matching this exact structure, with no
 """.strip()
 
 
+TASK_LEAF = "TASK: Identify the semantic category and produce concise JSON persona fields."
+TASK_BRANCH = "TASK: Write a parent-level definition that unifies these children into a precise category header."
+
+
+def _build_user_prompt(
+    task: str, root_rule: str, path_context: str, path: Path, parent_constraint: Optional[str], body: str
+) -> str:
+    """
+    Assemble a user prompt. Static text comes first, then progressively more folder-specific
+    parts, so consecutive requests share a long identical prefix the LLM server can reuse
+    from its KV cache.
+    """
+    parts = [
+        task,
+        f"GLOBAL CONSTRAINT: {root_rule}",
+        f"PATH CONTEXT: {path_context}",
+        f"Absolute path: {path}",
+        f"Hierarchy: {list(path.parts)}",
+    ]
+    if parent_constraint:
+        parts.append(f"\n{parent_constraint}\n")
+    parts.append(body)
+    return "\n".join(parts)
+
+
+@dataclass
+class _PendingDirectory:
+    """A scanned directory whose persona is built once all its children are done"""
+    path: Path
+    depth: int
+    children_dirs: List[Path]
+    files: List[Path]
+    mtimes: Dict[Path, float]
+    child_results: List[Tuple[Path, FolderPersona]] = field(default_factory=list)
+
+
 class PersonaBuilder:
-    def __init__(self, settings: BuilderSettings, llm: BaseLLM, database: PersonaDatabase):
+    def __init__(
+        self,
+        settings: BuilderSettings,
+        llm: BaseLLM,
+        database: PersonaDatabase,
+        llm_cache: Optional[LLMCache] = None,
+    ):
         self.settings = settings
         self.llm = llm
         self.database = database
-        self.visited: Set[Path] = set()
+        self.llm_cache = llm_cache
+        # (st_dev, st_ino) of every folder entered: one stat instead of a resolve() walk per folder
+        self.visited: Set[Tuple[int, int]] = set()
+        # --parallel scans folders on worker threads; the check-and-add on visited must be atomic
+        self._visited_lock = threading.Lock()
+        # In-run embedding memo keyed by build_embedding_key, in front of the persistent cache
+        self._embedding_memo: Dict[str, List[float]] = {}
+        # Caps in-flight LLM requests at what the provider handles well
+        self._llm_slots = threading.BoundedSemaphore(llm.max_concurrency)
+        # One extraction pool for the whole run, shared by every leaf (and by --parallel
+        # workers), instead of a pool started and torn down per folder
+        self._extract_pool = ThreadPoolExecutor(max_workers=EXTRACT_WORKERS, thread_name_prefix="extract")
+
+    def close(self) -> None:
+        """Stop the extraction workers"""
+        self._extract_pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def build_for_root(self, root: Path) -> FolderPersona:
-        return self._process_directory(root, depth=0)
+        """
+        First pass: Bottom-up build.
+        Sequential runs use an iterative post-order walk with an explicit stack, so deep
+        trees cannot hit the recursion limit.
+        """
+        if self.settings.allow_parallel:
+            return self._build_parallel(root)
+
+        started = self._begin_directory(root, depth=0)
+        if isinstance(started, FolderPersona):
+            return started
+
+        stack: List[_PendingDirectory] = [started]
+        while True:
+            pending = stack[-1]
+            # Each finished child appends one result, so its count indexes the next child
+            if len(pending.child_results) < len(pending.children_dirs):
+                child = pending.children_dirs[len(pending.child_results)]
+                started = self._begin_directory(child, pending.depth + 1)
+                if isinstance(started, FolderPersona):
+                    pending.child_results.append((child, started))
+                else:
+                    stack.append(started)
+                continue
+
+            stack.pop()
+            folder_persona = self._finish_directory(pending)
+            if not stack:
+                return folder_persona
+            stack[-1].child_results.append((pending.path, folder_persona))
 
     def refine_with_parent_constraints(self, root: Path) -> None:
         """
         Second pass: Top-down refinement.
         Apply parent constraints to children and re-generate personas.
+        Iterative pre-order walk: an explicit stack instead of recursion, so deep trees
+        cannot hit the recursion limit.
         """
-        self._refine_directory(root, parent_persona=None, depth=0)
-
-    def _refine_directory(self, path: Path, parent_persona: Optional[FolderPersona], depth: int) -> None:
+        stack: List[Tuple[Path, Optional[FolderPersona], int]] = [(root, None, 0)]
+        while stack:
+            path, parent_persona, depth = stack.pop()
+            current_persona, children_dirs = self._refine_directory(path, parent_persona, depth)
+            if not current_persona:
+                continue  # Skip subtree if not processed in first pass
+
+            # Folders that were re-processed have already been listed
+            if children_dirs is None:
+                try:
+                    children_dirs = self._scan_child_dirs(path)
+                except Exception:
+                    continue  # Skip if can't read directory
+
+            # Reversed so children pop in listing order (pre-order: parent before children)
+            stack.extend((child, current_persona, depth + 1) for child in reversed(children_dirs))
+
+    def _refine_directory(
+        self, path: Path, parent_persona: Optional[FolderPersona], depth: int
+    ) -> Tuple[Optional[FolderPersona], Optional[List[Path]]]:
         """
-        Recursively refine personas with parent context (pre-order traversal).
+        Refine a single persona with its parent's context.
+        Returns the (possibly refined) persona, or None if it was never built, along with
+        the child directories if refining had to list the folder (None otherwise).
         """
         # Load current persona from database
         current_persona = self.database.load_persona(str(path))
         if not current_persona:
-            return  # Skip if not processed in first pass
+            return None, None
 
         # Build parent constraint if parent exists
         parent_constraint = None
@@ -113,54 +232,54 @@ class PersonaBuilder:
             )
 
         # Re-process if parent constraint exists and is different
+        children_dirs: Optional[List[Path]] = None
         if parent_constraint and current_persona.constraints.parent_constraint != parent_constraint:
             print(f"  Refining with parent context: {path}")
-            refined_persona = self._reprocess_with_parent_constraint(
-                path, current_persona, parent_constraint, depth
-            )
+            refined_persona = None
+            try:
+                children_dirs, files, mtimes = self._scan_directory(path)
+            except Exception as e:
+                print(f"    Error refining {path}: {e}")
+            else:
+                refined_persona = self._reprocess_with_parent_constraint(
+                    path, current_persona, parent_constraint, depth, children_dirs, files, mtimes
+                )
             if refined_persona:
                 self.database.save_persona(refined_persona)
                 current_persona = refined_persona
 
-        # Recurse into children (pre-order: parent before children)
-        try:
-            children_dirs = [
-                p for p in path.iterdir()
-                if p.is_dir() and (self.settings.follow_symlinks or not p.is_symlink())
-            ]
-            for child in children_dirs:
-                self._refine_directory(child, current_persona, depth + 1)
-        except Exception:
-            pass  # Skip if can't read directory
+        return current_persona, children_dirs
 
     def _reprocess_with_parent_constraint(
-        self, path: Path, current_persona: FolderPersona, parent_constraint: str, depth: int
+        self,
+        path: Path,
+        current_persona: FolderPersona,
+        parent_constraint: str,
+        depth: int,
+        children_dirs: List[Path],
+        files: List[Path],
+        mtimes: Dict[Path, float],
     ) -> Optional[FolderPersona]:
-        """Re-generate persona with parent constraint"""
+        """Re-generate persona with parent constraint, from the folder's listing"""
         try:
-            # Get files or children
-            files = [p for p in path.iterdir() if p.is_file()]
             textual_files = [f for f in files if is_textual(f)]
-            children_dirs = [
-                p for p in path.iterdir()
-                if p.is_dir() and (self.settings.follow_symlinks or not p.is_symlink())
-            ]
 
             root_rule = detect_root_constraint(self.settings.root_path, path)
             path_context = build_path_context(self.settings.root_path, path)
 
             # Re-build persona with parent constraint
-            if current_persona.meta.node_type == NodeType.LEAF:
+            if not files and not children_dirs:
+                persona, vector_data, audit_errors, sample_count = self._empty_persona(path)
+            elif current_persona.meta.node_type == NodeType.LEAF:
                 persona, vector_data, audit_errors, sample_count = self._build_leaf_persona(
-                    path, textual_files, root_rule, path_context, parent_constraint
+                    path, textual_files, root_rule, path_context, parent_constraint, mtimes
                 )
             else:
-                # For BRANCH, load child personas from DB
-                child_results = []
-                for child in children_dirs:
-                    child_persona = self.database.load_persona(str(child))
-                    if child_persona:
-                        child_results.append((child, child_persona))
+                # For BRANCH, load child personas from DB in one query
+                child_personas = self.database.load_personas([str(child) for child in children_dirs])
+                child_results = [
+                    (child, child_personas[str(child)]) for child in children_dirs if str(child) in child_personas
+                ]
 
                 persona, vector_data, audit_errors, sample_count = self._build_branch_persona(
                     path, child_results, textual_files, [], root_rule, path_context, parent_constraint
@@ -171,7 +290,7 @@ class PersonaBuilder:
                 path=str(path),
                 node_type=current_persona.meta.node_type,
                 depth=depth,
-                confidence=DEFAULT_CONFIDENCE,
+                confidence=global_config.DEFAULT_CONFIDENCE,
                 structural_hash=current_persona.meta.structural_hash,
             )
             constraints = Constraints(
@@ -189,65 +308,120 @@ class PersonaBuilder:
             folder_persona.audit.sample_count = sample_count
             folder_persona.audit.errors = audit_errors
 
-            # Generate embedding for semantic search
-            self._generate_embedding(folder_persona)
-
             return folder_persona
         except Exception as e:
             print(f"    Error refining {path}: {e}")
             return None
 
-    def _process_directory(self, path: Path, depth: int) -> FolderPersona:
+    def _build_parallel(self, root: Path) -> FolderPersona:
+        """
+        Parallel bottom-up build: sibling subtrees are independent, so scans and persona
+        builds run on one bounded pool, and a directory is finished as soon as its last
+        child completes. All bookkeeping happens on the calling thread.
+        """
+        started = self._begin_directory(root, depth=0)
+        if isinstance(started, FolderPersona):
+            return started
+
+        # Per pending directory: its parent, and the child personas collected so far
+        parents: Dict[Path, Optional[_PendingDirectory]] = {root: None}
+        collected: Dict[Path, Dict[Path, FolderPersona]] = {}
+        running: Dict[Future, Tuple[Optional[_PendingDirectory], Path]] = {}
+        root_persona: Optional[FolderPersona] = None
+
+        # At least enough workers to keep every LLM slot busy while others scan and extract
+        with ThreadPoolExecutor(max_workers=max(BUILD_WORKERS, self.llm.max_concurrency)) as executor:
+
+            def schedule(pending: _PendingDirectory) -> None:
+                if not pending.children_dirs:
+                    running[executor.submit(self._finish_directory, pending)] = (None, pending.path)
+                    return
+                collected[pending.path] = {}
+                for child in pending.children_dirs:
+                    future = executor.submit(self._begin_directory, child, pending.depth + 1)
+                    running[future] = (pending, child)
+
+            def child_done(parent: Optional[_PendingDirectory], child: Path, folder_persona: FolderPersona) -> None:
+                nonlocal root_persona
+                if parent is None:
+                    root_persona = folder_persona
+                    return
+                results = collected[parent.path]
+                results[child] = folder_persona
+                if len(results) == len(parent.children_dirs):
+                    # Listing order, as in a sequential build, since it shapes the branch prompt
+                    parent.child_results = [(c, results[c]) for c in parent.children_dirs]
+                    del collected[parent.path]
+                    running[executor.submit(self._finish_directory, parent)] = (None, parent.path)
+
+            schedule(started)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    parent, path = running.pop(future)
+                    result = future.result()
+                    if parent is None:
+                        # A directory finished; report it to its own parent
+                        child_done(parents.pop(path), path, result)
+                    elif isinstance(result, FolderPersona):
+                        child_done(parent, path, result)
+                    else:
+                        parents[path] = parent
+                        schedule(result)
+
+        assert root_persona is not None
+        return root_persona
+
+    def _begin_directory(self, path: Path, depth: int) -> Union[FolderPersona, _PendingDirectory]:
+        """
+        Return the finished persona if the folder needs no work (already in DB, symlink loop),
+        otherwise its scan, to be completed by _finish_directory once the children are built.
+        """
         # Check if folder already exists in database - skip if found
         existing_persona = self.database.load_persona(str(path))
         if existing_persona:
             print(f"  [SKIP] Already in DB: {path}")
             return existing_persona
 
-        real = path.resolve()
-        if real in self.visited and not self.settings.follow_symlinks:
+        # A directory's device and inode identify it however it was reached, like its real path
+        st = path.stat()
+        key = (st.st_dev, st.st_ino)
+        with self._visited_lock:
+            seen = key in self.visited
+            self.visited.add(key)
+        if seen and not self.settings.follow_symlinks:
             return self._symlink_placeholder(path, depth)
-        self.visited.add(real)
 
-        children_dirs = [
-            p
-            for p in path.iterdir()
-            if p.is_dir() and (self.settings.follow_symlinks or not p.is_symlink())
-        ]
-        child_results: List[Tuple[Path, FolderPersona]] = []
-
-        if children_dirs:
-            if self.settings.allow_parallel:
-                with ThreadPoolExecutor() as executor:
-                    futures = {executor.submit(self._process_directory, c, depth + 1): c for c in children_dirs}
-                    wait(futures)
-                    for future, child in futures.items():
-                        child_results.append((child, future.result()))
-            else:
-                for child in children_dirs:
-                    child_results.append((child, self._process_directory(child, depth + 1)))
+        children_dirs, files, mtimes = self._scan_directory(path)
+        return _PendingDirectory(path, depth, children_dirs, files, mtimes)
+
+    def _finish_directory(self, pending: _PendingDirectory) -> FolderPersona:
+        path, depth = pending.path, pending.depth
+        child_results = pending.child_results
 
-        files = [p for p in path.iterdir() if p.is_file()]
-        textual_files = [f for f in files if is_textual(f)]
+        # One pass splits the listing; a "not in textual_files" filter was quadratic in folder size
+        textual_files: List[Path] = []
+        loose_files: List[Path] = []
+        for f in pending.files:
+            (textual_files if is_textual(f) else loose_files).append(f)
         text_file_count = len(textual_files)
-        subfolder_count = len(children_dirs)
+        subfolder_count = len(pending.children_dirs)
         is_empty = text_file_count == 0 and subfolder_count == 0
 
-        loose_files = [f for f in files if f not in textual_files]
-
         node_type = self._classify_node(text_file_count, subfolder_count, is_empty)
 
-        existing_persona = self._load_existing_persona(path)
-        structural_hash = self._compute_structural_hash(path, files, child_results)
-        if existing_persona and existing_persona.meta.structural_hash == structural_hash:
-            return existing_persona
+        # Folders already in the database were returned by _begin_directory before their
+        # children were walked, so every folder reaching here is new and needs building
+        structural_hash = self._compute_structural_hash(path, pending.files, child_results, pending.mtimes)
 
         root_rule = detect_root_constraint(self.settings.root_path, path)
         path_context = build_path_context(self.settings.root_path, path)
 
-        if node_type == NodeType.LEAF:
+        if not pending.files and not pending.children_dirs:
+            persona, vector_data, audit_errors, sample_count = self._empty_persona(path)
+        elif node_type == NodeType.LEAF:
             persona, vector_data, audit_errors, sample_count = self._build_leaf_persona(
-                path, textual_files, root_rule, path_context
+                path, textual_files, root_rule, path_context, mtimes=pending.mtimes
             )
         else:
             persona, vector_data, audit_errors, sample_count = self._build_branch_persona(
@@ -258,7 +432,7 @@ class PersonaBuilder:
             path=str(path),
             node_type=node_type,
             depth=depth,
-            confidence=DEFAULT_CONFIDENCE,
+            confidence=global_config.DEFAULT_CONFIDENCE,
             structural_hash=structural_hash,
         )
         constraints = Constraints(path_context=path_context, root_rule=root_rule)
@@ -272,53 +446,76 @@ class PersonaBuilder:
         folder_persona.audit.sample_count = sample_count
         folder_persona.audit.errors = audit_errors
 
-        # Generate embedding for semantic search
-        self._generate_embedding(folder_persona)
-
         # Save to database instead of writing to file
         self.database.save_persona(folder_persona)
         return folder_persona
 
+    def _scan_directory(self, path: Path) -> Tuple[List[Path], List[Path], Dict[Path, float]]:
+        """
+        List child directories and files in a single os.scandir pass.
+        DirEntry answers is_dir/is_file/is_symlink from the directory listing itself,
+        instead of the extra stat/lstat per entry that Path.iterdir() checks cost.
+        File mtimes come from DirEntry.stat(), which is cached on the entry.
+        """
+        children_dirs: List[Path] = []
+        files: List[Path] = []
+        mtimes: Dict[Path, float] = {}
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if self.settings.follow_symlinks or not entry.is_symlink():
+                        children_dirs.append(Path(entry.path))
+                elif entry.is_file():
+                    file_path = Path(entry.path)
+                    files.append(file_path)
+                    mtimes[file_path] = entry.stat().st_mtime
+        return children_dirs, files, mtimes
+
+    def _scan_child_dirs(self, path: Path) -> List[Path]:
+        """Child directories only, from a single os.scandir pass (no per-file stat)"""
+        with os.scandir(path) as entries:
+            return [
+                Path(entry.path)
+                for entry in entries
+                if entry.is_dir() and (self.settings.follow_symlinks or not entry.is_symlink())
+            ]
+
     def _classify_node(self, text_count: int, subfolder_count: int, is_empty: bool) -> NodeType:
         if is_empty:
             return NodeType.BRANCH
-        if text_count >= MIN_TEXT_FILES and text_count >= 2 * subfolder_count:
+        if text_count >= global_config.MIN_TEXT_FILES and text_count >= 2 * subfolder_count:
             return NodeType.LEAF
         return NodeType.BRANCH
 
     def _build_leaf_persona(
-        self, path: Path, textual_files: List[Path], root_rule: str, path_context: str, parent_constraint: Optional[str] = None
+        self,
+        path: Path,
+        textual_files: List[Path],
+        root_rule: str,
+        path_context: str,
+        parent_constraint: Optional[str] = None,
+        mtimes: Optional[Dict[Path, float]] = None,
     ) -> Tuple[Persona, VectorData, List[str], int]:
-        samples = sample_files(textual_files, SAMPLE_LIMIT)
+        samples = sample_files(textual_files, global_config.SAMPLE_LIMIT, mtimes)
         snippets: List[str] = []
         errors: List[str] = []
         derived_from: List[str] = []
-        for sample in samples:
-            text, errs = safe_extract(sample)
+        # Extraction is I/O bound (file reads, zip inflate, PDF decode), so overlap it across samples
+        if len(samples) > 1:
+            extracted = list(self._extract_pool.map(safe_extract, samples))
+        else:
+            extracted = [safe_extract(sample) for sample in samples]
+        for sample, (text, errs) in zip(samples, extracted):
             derived_from.append(sample.name)
             snippets.append(f"# {sample.name}\n{text[:500]}")
             errors.extend(errs)
 
         file_snippets = "\n".join(snippets)
 
-        # Build prompt with optional parent constraint
-        prompt_parts = [
-            f"Absolute path: {path}",
-            f"Hierarchy: {list(path.parts)}",
-            f"GLOBAL CONSTRAINT: {root_rule}",
-            f"PATH CONTEXT: {path_context}",
-        ]
-
-        if parent_constraint:
-            prompt_parts.append(f"\n{parent_constraint}\n")
-
-        prompt_parts.extend([
-            f"FILES:\n{file_snippets}",
-            "TASK: Identify the semantic category and produce concise JSON persona fields."
-        ])
-
-        user_prompt = "\n".join(prompt_parts)
-        response = safe_generate(self.llm, SYSTEM_PROMPT_LEAF, user_prompt, response_schema=PersonaResponse)
+        user_prompt = _build_user_prompt(
+            TASK_LEAF, root_rule, path_context, path, parent_constraint, f"FILES:\n{file_snippets}"
+        )
+        response = self._generate(SYSTEM_PROMPT_LEAF, user_prompt)
         persona, vector_data, validation_errors = self._parse_llm_response(
             response.content,
             path.name or "Root",
@@ -351,24 +548,10 @@ class PersonaBuilder:
 
         children_block = "\n".join(lines)
 
-        # Build prompt with optional parent constraint
-        prompt_parts = [
-            f"Absolute path: {path}",
-            f"Hierarchy: {list(path.parts)}",
-            f"GLOBAL CONSTRAINT: {root_rule}",
-            f"PATH CONTEXT: {path_context}",
-        ]
-
-        if parent_constraint:
-            prompt_parts.append(f"\n{parent_constraint}\n")
-
-        prompt_parts.extend([
-            f"CHILDREN:\n{children_block}",
-            "TASK: Write a parent-level definition that unifies these children into a precise category header."
-        ])
-
-        user_prompt = "\n".join(prompt_parts)
-        response = safe_generate(self.llm, SYSTEM_PROMPT_BRANCH, user_prompt, response_schema=PersonaResponse)
+        user_prompt = _build_user_prompt(
+            TASK_BRANCH, root_rule, path_context, path, parent_constraint, f"CHILDREN:\n{children_block}"
+        )
+        response = self._generate(SYSTEM_PROMPT_BRANCH, user_prompt)
         persona, vector_data, validation_errors = self._parse_llm_response(
             response.content,
             path.name or "Root",
@@ -378,9 +561,50 @@ class PersonaBuilder:
         sample_count = len(textual_files)
         return persona, vector_data, errors, sample_count
 
+    @staticmethod
+    def _empty_persona(path: Path) -> Tuple[Persona, VectorData, List[str], int]:
+        """A folder with no files and no subfolders gives the LLM nothing to describe, so skip the call"""
+        persona = Persona(
+            short_label=path.name or "Root",
+            description="Empty directory.",
+            derived_from=[],
+            negative_constraints=[],
+        )
+        return persona, VectorData(), [], 0
+
+    def _generate(self, system_prompt: str, user_prompt: str) -> LLMResponse:
+        """Call the LLM, serving identical (model, prompt) requests from the response cache"""
+        if self.llm_cache is None:
+            with self._llm_slots:
+                return safe_generate(self.llm, system_prompt, user_prompt, response_schema=PersonaResponse)
+
+        model = getattr(self.llm, "model", None) or type(self.llm).__name__
+        key = build_cache_key(model, system_prompt, user_prompt)
+        cached = self.llm_cache.get(key)
+        if cached is not None:
+            return LLMResponse(content=cached, model=model)
+
+        with self._llm_slots:
+            response = safe_generate(self.llm, system_prompt, user_prompt, response_schema=PersonaResponse)
+        # Never cache fallback output: the next run should retry the real LLM
+        if response.model != "fallback":
+            self.llm_cache.put(key, model, response.content)
+        return response
+
     def _parse_llm_response(
         self, content: str, default_label: str, derived_from: List[str]
     ) -> Tuple[Persona, VectorData, List[str]]:
+        # Well-formed responses match PersonaResponse exactly (it is the schema we request), so
+        # let pydantic-core parse and validate them in one pass; anything else takes the lenient path
+        try:
+            response = PersonaResponse.model_validate_json(content)
+        except ValidationError:
+            pass
+        else:
+            if "derived_from" not in response.persona.model_fields_set:
+                response.persona.derived_from = derived_from
+            return response.persona, response.vector_data, []
+
         errors: List[str] = []
         fallback_description = content[:800]
         fallback_persona = Persona(
@@ -438,36 +662,82 @@ class PersonaBuilder:
             return "Loose files: " + ", ".join(names)
         return "Loose files sample: " + ", ".join(names[:6]) + " (+more)"
 
-    def _load_existing_persona(self, path: Path) -> Optional[FolderPersona]:
-        # Load from database instead of file
-        try:
-            return self.database.load_persona(str(path))
-        except Exception:
-            return None
-
-    def _generate_embedding(self, folder_persona: FolderPersona) -> None:
-        """Generate embedding vector for semantic search"""
+    def embed_personas(self, root: Path) -> int:
+        """
+        Final pass: fill in missing embeddings for all personas under root.
+        Runs after refinement so each folder is embedded once, in its final form, and
+        sends uncached texts to the embeddings API in batches of EMBED_BATCH_SIZE.
+        Returns the number of personas that received an embedding.
+        """
         # Only generate embeddings for Fireworks LLM
         from .llm import FireworksLLM
         if not isinstance(self.llm, FireworksLLM):
-            return
+            return 0
+
+        root_prefix = str(root).rstrip(os.sep) + os.sep
+        pending = [
+            folder_persona
+            for folder_persona in self.database.iter_personas()
+            if folder_persona.vector_data.embedding is None
+            and (folder_persona.meta.path == str(root) or folder_persona.meta.path.startswith(root_prefix))
+        ]
+
+        model = self.llm.embedding_model
+        keyed = [(folder_persona, self._embedding_text(folder_persona)) for folder_persona in pending]
+        keyed = [(folder_persona, text, build_embedding_key(model, text)) for folder_persona, text in keyed]
+
+        # Resolve what we can from the memo / persistent cache; batch the rest (deduplicated)
+        misses: Dict[str, str] = {}
+        for _, text, key in keyed:
+            if key in self._embedding_memo or key in misses:
+                continue
+            cached = self.llm_cache.get_embedding(key) if self.llm_cache is not None else None
+            if cached is not None:
+                self._embedding_memo[key] = cached
+            else:
+                misses[key] = text
+
+        miss_items = list(misses.items())
+        batches = [miss_items[start:start + EMBED_BATCH_SIZE] for start in range(0, len(miss_items), EMBED_BATCH_SIZE)]
+
+        def embed_batch(batch: List[Tuple[str, str]]) -> List[Optional[List[float]]]:
+            return self.llm.generate_embeddings([text for _, text in batch])
+
+        # Large trees need several requests; overlap their round trips
+        if len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(EMBED_WORKERS, len(batches))) as executor:
+                results = list(executor.map(embed_batch, batches))
+        else:
+            results = [embed_batch(batch) for batch in batches]
+
+        for batch, embeddings in zip(batches, results):
+            for (key, _), embedding in zip(batch, embeddings):
+                if not embedding:
+                    continue
+                self._embedding_memo[key] = embedding
+                if self.llm_cache is not None:
+                    self.llm_cache.put_embedding(key, model, embedding)
+
+        count = 0
+        for folder_persona, _, key in keyed:
+            embedding = self._embedding_memo.get(key)
+            if embedding is None:
+                continue
+            folder_persona.vector_data.embedding = embedding
+            folder_persona.vector_data.embedding_model = model
+            self.database.save_persona(folder_persona)
+            count += 1
+        return count
 
-        # Combine description and queries for embedding
+    @staticmethod
+    def _embedding_text(folder_persona: FolderPersona) -> str:
+        """Combine label, description and queries into the text that gets embedded"""
         text_parts = [
             folder_persona.persona.short_label,
             folder_persona.persona.description,
         ]
         text_parts.extend(folder_persona.vector_data.hypothetical_user_queries)
-
-        embedding_text = " | ".join(text_parts)
-
-        try:
-            embedding = self.llm.generate_embedding(embedding_text)
-            if embedding:
-                folder_persona.vector_data.embedding = embedding
-                folder_persona.vector_data.embedding_model = self.llm.embedding_model
-        except Exception as e:
-            print(f"  Warning: Could not generate embedding: {e}")
+        return " | ".join(text_parts)
 
     def _symlink_placeholder(self, path: Path, depth: int) -> FolderPersona:
         root_rule = detect_root_constraint(self.settings.root_path, path)
@@ -499,14 +769,21 @@ class PersonaBuilder:
         return folder_persona
 
     def _compute_structural_hash(
-        self, path: Path, files: List[Path], child_results: List[Tuple[Path, FolderPersona]]
+        self,
+        path: Path,
+        files: List[Path],
+        child_results: List[Tuple[Path, FolderPersona]],
+        mtimes: Optional[Dict[Path, float]] = None,
     ) -> str:
-        hasher = hashlib.sha256()
-        file_entries = [f"{p.name}:{p.stat().st_mtime}" for p in sorted(files)]
-        child_entries = [
-            f"{child.name}:{persona.meta.structural_hash}"
-            for child, persona in sorted(child_results, key=lambda c: c[0].name)
-        ]
-        payload = json.dumps({"files": file_entries, "children": child_entries}, sort_keys=True)
-        hasher.update(payload.encode("utf-8"))
-        return hasher.hexdigest()
+        # One tagged, NUL-terminated record per file and child (names cannot contain NUL),
+        # hashed in one go instead of building and JSON-encoding a payload dict.
+        # Entries share a parent, so sorting by name orders them like the paths.
+        if mtimes is not None:
+            # mtimes captured by _scan_directory save a second stat() per file
+            file_entries = sorted([(p.name, mtimes[p]) for p in files])
+        else:
+            file_entries = sorted([(p.name, p.stat().st_mtime) for p in files])
+        child_entries = sorted([(child.name, persona.meta.structural_hash) for child, persona in child_results])
+        payload = "".join([f"f{name}\0{mtime!r}\0" for name, mtime in file_entries])
+        payload += "".join([f"c{name}\0{child_hash}\0" for name, child_hash in child_entries])
+        return hashlib.sha256(payload.encode("utf-8", errors="surrogateescape")).hexdigest()
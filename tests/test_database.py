@@ -0,0 +1,101 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from map_maker.database import PersonaDatabase
+from map_maker.schema import Constraints, FolderPersona, Meta, NodeType, Persona
+
+
+def _persona(path: Path, label: str = "Invoices", node_type: NodeType = NodeType.LEAF) -> FolderPersona:
+    return FolderPersona(
+        meta=Meta(path=str(path), node_type=node_type, depth=1, structural_hash="abc"),
+        constraints=Constraints(path_context=path.name, root_rule="General"),
+        persona=Persona(short_label=label, description=f"{label} folder"),
+    )
+
+
+def _stored_paths(db_path: Path) -> list:
+    """Rows visible on disk, read through a separate connection"""
+    with sqlite3.connect(db_path) as conn:
+        return [row[0] for row in conn.execute("SELECT path FROM folder_personas ORDER BY path")]
+
+
+class PersonaDatabaseBufferTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.db_path = self.tmp / "personas.db"
+        # Large enough that nothing flushes on its own during a test
+        self.db = PersonaDatabase(self.db_path, batch_size=1000, flush_interval=3600)
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def test_load_persona_sees_unflushed_save(self):
+        folder = self.tmp / "Invoices"
+        self.db.save_persona(_persona(folder))
+
+        self.assertEqual(_stored_paths(self.db_path), [])
+        loaded = self.db.load_persona(str(folder))
+        self.assertIsNotNone(loaded)
+        self.assertEqual(loaded.persona.short_label, "Invoices")
+        self.assertEqual(list(self.db.load_personas([str(folder)])), [str(folder)])
+
+    def test_save_replaces_previously_loaded_persona(self):
+        folder = self.tmp / "Invoices"
+        self.db.save_persona(_persona(folder))
+        self.db.load_persona(str(folder))
+
+        self.db.save_persona(_persona(folder, label="Receipts"))
+
+        self.assertEqual(self.db.load_persona(str(folder)).persona.short_label, "Receipts")
+
+    def test_get_stats_sees_unflushed_saves(self):
+        self.db.save_persona(_persona(self.tmp / "a"))
+        self.db.save_persona(_persona(self.tmp / "b", node_type=NodeType.BRANCH))
+
+        stats = self.db.get_stats()
+
+        self.assertEqual(stats["total_folders"], 2)
+        self.assertEqual(stats["breakdown"], {"LEAF": 1, "BRANCH": 1})
+
+    def test_export_sees_unflushed_saves(self):
+        folder = self.tmp / "Invoices"
+        self.db.save_persona(_persona(folder))
+
+        self.assertEqual(self.db.export_to_json_files(self.tmp), 1)
+        exported = FolderPersona.from_file(folder / "folder_persona.json")
+        self.assertEqual(exported.persona.short_label, "Invoices")
+
+    def test_close_flushes_pending_saves(self):
+        folder = self.tmp / "Invoices"
+        self.db.save_persona(_persona(folder))
+
+        self.db.close()
+
+        self.assertEqual(_stored_paths(self.db_path), [str(folder)])
+
+    def test_identical_save_skips_the_write(self):
+        folder = self.tmp / "Invoices"
+        self.db.save_persona(_persona(folder))
+        self.db.flush()
+        self.db.conn.execute("UPDATE folder_personas SET updated_at = '2000-01-01 00:00:00'")
+        self.db.conn.commit()
+
+        changes_before = self.db.conn.total_changes
+        self.db.save_persona(_persona(folder))
+        self.db.flush()
+
+        self.assertEqual(self.db.conn.total_changes, changes_before)
+        updated_at = self.db.conn.execute("SELECT updated_at FROM folder_personas").fetchone()[0]
+        self.assertEqual(updated_at, "2000-01-01 00:00:00")
+
+        self.db.save_persona(_persona(folder, label="Receipts"))
+        self.db.flush()
+        self.assertEqual(self.db.conn.total_changes, changes_before + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
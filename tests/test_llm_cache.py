@@ -0,0 +1,92 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from map_maker.config import BuilderSettings
+from map_maker.database import PersonaDatabase
+from map_maker.llm import BaseLLM, LLMResponse
+from map_maker.llm_cache import LLMCache
+from map_maker.traversal import PersonaBuilder
+
+
+class CountingLLM(BaseLLM):
+    """Answers every prompt with a fixed reply and counts the calls, or fails when told to"""
+
+    model = "counting-model"
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def generate(self, system_prompt, user_prompt, response_schema=None):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("provider down")
+        return LLMResponse(content=f"reply {self.calls}", model=self.model)
+
+
+class GenerateCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.llm = CountingLLM()
+        self.cache = LLMCache(self.tmp / "llm.sqlite")
+        self.db = PersonaDatabase(self.tmp / "personas.db")
+
+    def tearDown(self):
+        self.db.close()
+        self.cache.close()
+        self._tmp.cleanup()
+
+    def _builder(self, llm_cache):
+        builder = PersonaBuilder(
+            settings=BuilderSettings(root_path=self.tmp), llm=self.llm, database=self.db, llm_cache=llm_cache
+        )
+        self.addCleanup(builder.close)
+        return builder
+
+    def test_cached_response_skips_the_provider(self):
+        builder = self._builder(self.cache)
+
+        first = builder._generate("system", "user")
+        second = builder._generate("system", "user")
+
+        self.assertEqual(self.llm.calls, 1)
+        self.assertEqual(second.content, first.content)
+        # A new builder over the same cache file (a later run) is served too
+        self.assertEqual(self._builder(self.cache)._generate("system", "user").content, "reply 1")
+        self.assertEqual(self.llm.calls, 1)
+
+    def test_different_prompts_miss(self):
+        builder = self._builder(self.cache)
+
+        builder._generate("system", "user one")
+        builder._generate("system", "user two")
+
+        self.assertEqual(self.llm.calls, 2)
+
+    def test_fallback_responses_are_not_stored(self):
+        builder = self._builder(self.cache)
+        self.llm.fail = True
+
+        response = builder._generate("system", "user")
+
+        self.assertEqual(response.model, "fallback")
+        self.assertEqual(self.cache.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0], 0)
+
+        self.llm.fail = False
+        self.assertEqual(builder._generate("system", "user").content, "reply 2")
+        self.assertEqual(self.llm.calls, 2)
+
+    def test_without_cache_every_call_reaches_the_provider(self):
+        builder = self._builder(None)
+
+        builder._generate("system", "user")
+        builder._generate("system", "user")
+
+        self.assertEqual(self.llm.calls, 2)
+        self.assertEqual(self.cache.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from map_maker.text_extraction import read_docx
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+  <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+  <Default Extension="xml" ContentType="application/xml"/>
+  <Override PartName="/word/document.xml"
+    ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+</Types>"""
+
+_PACKAGE_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+  <Relationship Id="rId1" Target="word/document.xml"
+    Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>
+</Relationships>"""
+
+_DOCUMENT = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="{_W_NS}" xmlns:r="{_R_NS}">
+  <w:body>
+    <w:p><w:r><w:t>Plain paragraph</w:t></w:r></w:p>
+    <w:p><w:r><w:t>Before</w:t><w:tab/><w:t>after tab</w:t></w:r></w:p>
+    <w:p>
+      <w:r><w:t>Line one</w:t><w:br/><w:t>line two</w:t></w:r>
+      <w:r><w:br w:type="page"/><w:t>next page</w:t><w:cr/><w:t>carriage</w:t></w:r>
+    </w:p>
+    <w:p>
+      <w:r><w:t xml:space="preserve">See </w:t></w:r>
+      <w:hyperlink r:id="rId9"><w:r><w:t>the link</w:t></w:r></w:hyperlink>
+      <w:r><w:t xml:space="preserve"> here</w:t><w:noBreakHyphen/><w:t>ok</w:t></w:r>
+    </w:p>
+    <w:tbl>
+      <w:tr><w:tc><w:p><w:r><w:t>Table cell</w:t></w:r></w:p></w:tc></w:tr>
+    </w:tbl>
+    <w:p>
+      <w:r><w:t xml:space="preserve">Kept </w:t></w:r>
+      <w:ins w:id="1" w:author="a"><w:r><w:t>inserted</w:t></w:r></w:ins>
+      <w:r><w:t>end</w:t></w:r>
+    </w:p>
+    <w:p/>
+    <w:sectPr/>
+  </w:body>
+</w:document>"""
+
+# What python-docx 1.2 returns for the same document, one entry per body paragraph:
+# table cells and tracked insertions are not part of Document.paragraphs text
+_EXPECTED = "\n".join([
+    "Plain paragraph",
+    "Before\tafter tab",
+    "Line one\nline twonext page\ncarriage",
+    "See the link here-ok",
+    "Kept end",
+    "",
+])
+
+# Malformed: w:body is the root element, so no run sits in a document body, hyperlinked or not
+_BODY_ROOT_DOCUMENT = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:body xmlns:w="{_W_NS}" xmlns:r="{_R_NS}">
+  <w:p>
+    <w:r><w:t>Plain run</w:t></w:r>
+    <w:hyperlink r:id="rId9"><w:r><w:t>the link</w:t></w:r></w:hyperlink>
+  </w:p>
+</w:body>"""
+
+
+class ReadDocxTests(unittest.TestCase):
+    def _read(self, document: str) -> str:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "sample.docx"
+            with zipfile.ZipFile(path, "w") as archive:
+                archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+                archive.writestr("_rels/.rels", _PACKAGE_RELS)
+                archive.writestr("word/document.xml", document)
+            return read_docx(path)
+
+    def test_matches_python_docx_paragraph_text(self):
+        self.assertEqual(self._read(_DOCUMENT), _EXPECTED)
+
+    def test_hyperlink_under_body_root_is_not_body_text(self):
+        self.assertEqual(self._read(_BODY_ROOT_DOCUMENT), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from map_maker import config as global_config
+from map_maker.config import BuilderSettings
+from map_maker.database import PersonaDatabase
+from map_maker.llm import StubLLM
+from map_maker.traversal import PersonaBuilder
+
+
+def _make_tree(root: Path) -> None:
+    """A small tree with a leaf, a mixed branch, an empty folder and a symlink loop"""
+    leaf = root / "Business" / "Invoices"
+    leaf.mkdir(parents=True)
+    for index in range(6):
+        (leaf / f"invoice_{index}.txt").write_text(f"Invoice number {index}\n")
+
+    mixed = root / "Private" / "Health"
+    mixed.mkdir(parents=True)
+    (mixed / "notes.md").write_text("Doctor visit notes\n")
+    (mixed / "scan.bin").write_bytes(b"\x00\x01")
+    (mixed / "Dental").mkdir()
+    (mixed / "Dental" / "checkup.txt").write_text("Dental checkup\n")
+
+    (root / "Private" / "Empty").mkdir()
+    os.symlink(root, root / "Business" / "loop", target_is_directory=True)
+
+
+class ParallelBuildTests(unittest.TestCase):
+    def setUp(self):
+        self._text_cache = global_config.TEXT_CACHE
+        global_config.TEXT_CACHE = False
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.root = self.tmp / "tree"
+        self.root.mkdir()
+        _make_tree(self.root)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        global_config.TEXT_CACHE = self._text_cache
+
+    def _build(self, allow_parallel: bool) -> dict:
+        settings = BuilderSettings(root_path=self.root, allow_parallel=allow_parallel)
+        db_name = "parallel.db" if allow_parallel else "sequential.db"
+        with PersonaDatabase(self.tmp / db_name) as db:
+            with PersonaBuilder(settings=settings, llm=StubLLM(), database=db) as builder:
+                root_persona = builder.build_for_root(self.root)
+            self.assertEqual(root_persona.meta.path, str(self.root))
+            return dict(db.iter_persona_json())
+
+    def test_parallel_build_matches_sequential(self):
+        sequential = self._build(allow_parallel=False)
+        parallel = self._build(allow_parallel=True)
+
+        self.assertEqual(parallel, sequential)
+        # Every real folder is built once; the symlink is never descended into
+        self.assertEqual(len(sequential), 7)
+        self.assertNotIn(str(self.root / "Business" / "loop"), sequential)
+
+    def test_empty_folder_is_described_without_the_llm(self):
+        personas = self._build(allow_parallel=True)
+
+        empty = personas[str(self.root / "Private" / "Empty")]
+        self.assertIn('"description":"Empty directory."', empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
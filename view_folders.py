@@ -5,105 +5,176 @@ Usage: python view_folders.py [path_to_database.db] [options]
 """
 
 import argparse
+import itertools
 import json
 import sqlite3
 import sys
 from pathlib import Path
+from typing import Optional
+
+try:
+    # Rust parser, faster than json.loads and reads the raw bytes without a str decode
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+# Shared defaults for absent keys, so .get() doesn't build a fresh {} or [] per row; never mutated
+_EMPTY = {}
+
+_RULE = "=" * 100
+_SEPARATOR = "-" * 100
+
+# Default listing: SQLite extracts the two shown fields, so rows need no JSON decode in Python.
+# Rows that aren't a JSON object with a "persona" object also return the raw JSON, which the
+# full decode path reports on as before.
+_SUMMARY_QUERY = """
+    SELECT
+        path,
+        CASE
+            WHEN NOT json_valid(persona_json) THEN CAST(persona_json AS BLOB)
+            WHEN json_type(persona_json, '$.persona') IS NOT 'object' THEN CAST(persona_json AS BLOB)
+        END,
+        CASE WHEN json_valid(persona_json) THEN IFNULL(json_extract(persona_json, '$.persona.short_label'), 'N/A') END,
+        CASE WHEN json_valid(persona_json) THEN IFNULL(json_extract(persona_json, '$.persona.description'), 'N/A') END
+    FROM folder_personas ORDER BY path LIMIT ? OFFSET ?
+"""
+
+_FULL_QUERY = """
+    SELECT path, CAST(persona_json AS BLOB) FROM folder_personas ORDER BY path LIMIT ? OFFSET ?
+"""
+
+
+def _format_summary(path, short_label, description) -> str:
+    """One folder's default listing entry, from the fields SQLite extracted"""
+    return f"\nPATH: {path}\n  LABEL: {short_label}\n  DESC:  {description}\n{_SEPARATOR}\n"
+
+
+def _format_row(path, persona_json, show_queries: bool = False, show_constraints: bool = False,
+                show_derived: bool = False, show_meta: bool = False) -> str:
+    """One folder's listing entry, decoded from its persona JSON"""
+    lines = []
+    try:
+        data = _loads(persona_json)
+        persona = data.get("persona", _EMPTY)
+        meta = data.get("meta", _EMPTY)
+        constraints = data.get("constraints", _EMPTY)
+        vector_data = data.get("vector_data", _EMPTY)
+
+        short_label = persona.get("short_label", "N/A")
+        description = persona.get("description", "N/A")
+
+        lines.append(f"\nPATH: {path}")
+        lines.append(f"  LABEL: {short_label}")
+        lines.append(f"  DESC:  {description}")
+
+        # Show metadata
+        if show_meta:
+            node_type = meta.get("node_type", "N/A")
+            depth = meta.get("depth", "N/A")
+            confidence = meta.get("confidence", "N/A")
+            language = meta.get("language", "N/A")
+            lines.append(f"   META: Type={node_type}, Depth={depth}, Confidence={confidence}, Language={language}")
+
+        # Show what it was derived from
+        if show_derived:
+            derived_from = persona.get("derived_from", ())
+            if derived_from:
+                lines.append(f"   DERIVED FROM: {', '.join(derived_from)}")
+
+        # Show constraints
+        if show_constraints:
+            parent_constraint = constraints.get("parent_constraint")
+            if parent_constraint:
+                lines.append(f"   PARENT CONSTRAINT: {parent_constraint[:100]}...")
+
+            negative_constraints = persona.get("negative_constraints", ())
+            if negative_constraints:
+                lines.append(f"   NEGATIVE CONSTRAINTS: {', '.join(negative_constraints)}")
+
+        # Show hypothetical queries
+        if show_queries:
+            queries = vector_data.get("hypothetical_user_queries", ())
+            if queries:
+                lines.append(f"   HYPOTHETICAL QUERIES:")
+                for i, query in enumerate(queries, 1):
+                    lines.append(f"      {i}. {query}")
+
+            embedding_model = vector_data.get("embedding_model")
+            has_embedding = vector_data.get("embedding") is not None
+            if embedding_model:
+                emb_status = "YES" if has_embedding else "NO"
+                lines.append(f"   EMBEDDING: {emb_status} ({embedding_model})")
+
+        lines.append(_SEPARATOR)
+
+    except Exception as e:
+        lines.append(f"\nPATH: {path}")
+        lines.append(f"  ERROR: {e}")
+        lines.append(_SEPARATOR)
+
+    return "\n".join(lines) + "\n"
 
 
 def view_folder_descriptions(db_path: str, show_queries: bool = False,
                             show_constraints: bool = False, show_derived: bool = False,
-                            show_meta: bool = False, show_full: bool = False):
+                            show_meta: bool = False, show_full: bool = False,
+                            limit: Optional[int] = None, offset: int = 0):
     """Display folder paths and their semantic descriptions"""
 
     if not Path(db_path).exists():
         print(f"Error: Database not found at {db_path}")
         sys.exit(1)
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT path, persona_json FROM folder_personas ORDER BY path
-    """)
-
-    rows = cursor.fetchall()
-
-    if not rows:
-        print("No folder personas found in database.")
-        conn.close()
-        return
-
     # If --full is specified, show everything
     if show_full:
         show_queries = show_constraints = show_derived = show_meta = True
 
-    print(f"\n{'='*100}")
-    print(f"FOLDER PERSONAS")
-    print(f"{'='*100}")
-
-    for path, persona_json in rows:
-        try:
-            data = json.loads(persona_json)
-            persona = data.get("persona", {})
-            meta = data.get("meta", {})
-            constraints = data.get("constraints", {})
-            vector_data = data.get("vector_data", {})
-
-            short_label = persona.get("short_label", "N/A")
-            description = persona.get("description", "N/A")
-
-            print(f"\nPATH: {path}")
-            print(f"  LABEL: {short_label}")
-            print(f"  DESC:  {description}")
-
-            # Show metadata
-            if show_meta:
-                node_type = meta.get("node_type", "N/A")
-                depth = meta.get("depth", "N/A")
-                confidence = meta.get("confidence", "N/A")
-                language = meta.get("language", "N/A")
-                print(f"   META: Type={node_type}, Depth={depth}, Confidence={confidence}, Language={language}")
-
-            # Show what it was derived from
-            if show_derived:
-                derived_from = persona.get("derived_from", [])
-                if derived_from:
-                    print(f"   DERIVED FROM: {', '.join(derived_from)}")
-
-            # Show constraints
-            if show_constraints:
-                parent_constraint = constraints.get("parent_constraint")
-                if parent_constraint:
-                    print(f"   PARENT CONSTRAINT: {parent_constraint[:100]}...")
-
-                negative_constraints = persona.get("negative_constraints", [])
-                if negative_constraints:
-                    print(f"   NEGATIVE CONSTRAINTS: {', '.join(negative_constraints)}")
-
-            # Show hypothetical queries
-            if show_queries:
-                queries = vector_data.get("hypothetical_user_queries", [])
-                if queries:
-                    print(f"   HYPOTHETICAL QUERIES:")
-                    for i, query in enumerate(queries, 1):
-                        print(f"      {i}. {query}")
-
-                embedding_model = vector_data.get("embedding_model")
-                has_embedding = vector_data.get("embedding") is not None
-                if embedding_model:
-                    emb_status = "YES" if has_embedding else "NO"
-                    print(f"   EMBEDDING: {emb_status} ({embedding_model})")
-
-            print(f"{'-'*100}")
-
-        except Exception as e:
-            print(f"\nPATH: {path}")
-            print(f"  ERROR: {e}")
-            print(f"{'-'*100}")
-
-    conn.close()
-    print(f"\nTotal folders: {len(rows)}\n")
+    # Read-only: no write locks or journal setup. Not immutable=1, which would skip the WAL
+    # and so miss personas a running build has not checkpointed yet.
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        # Same read settings as PersonaDatabase: memory-map the file, 64 MiB page cache
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-65536")
+        cursor = conn.cursor()
+
+        needs_full = show_queries or show_constraints or show_derived or show_meta
+        # LIMIT is applied by SQLite, so the path-index walk stops after the last shown row
+        # (a negative LIMIT means no limit)
+        cursor.execute(
+            _FULL_QUERY if needs_full else _SUMMARY_QUERY,
+            (-1 if limit is None else limit, offset),
+        )
+
+        # Rows are streamed from the cursor rather than fetched all at once,
+        # so memory stays flat and the first folder prints immediately
+        first_row = cursor.fetchone()
+        if first_row is None:
+            # An empty page can also mean --offset ran past the end or --limit 0
+            if conn.execute("SELECT EXISTS (SELECT 1 FROM folder_personas)").fetchone()[0]:
+                shown = f"offset {offset}" if limit is None else f"offset {offset}, limit {limit}"
+                print(f"No rows in the requested range ({shown}).")
+            else:
+                print("No folder personas found in database.")
+            return
+
+        print(f"\n{_RULE}")
+        print("FOLDER PERSONAS")
+        print(_RULE)
+
+        # Each folder is formatted into one string and written in a single call
+        write = sys.stdout.write
+        count = 0
+        for path, persona_json, *summary in itertools.chain((first_row,), cursor):
+            count += 1
+            if persona_json is None:
+                write(_format_summary(path, *summary))
+            else:
+                write(_format_row(path, persona_json, show_queries, show_constraints, show_derived, show_meta))
+
+    finally:
+        conn.close()
+    print(f"\nTotal folders: {count}\n")
 
 
 def main():
@@ -141,6 +212,17 @@ def main():
         action="store_true",
         help="Show all available information"
     )
+    parser.add_argument(
+        "-n", "--limit",
+        type=int,
+        help="Show at most this many folders"
+    )
+    parser.add_argument(
+        "--offset",
+        type=int,
+        default=0,
+        help="Skip this many folders first (in path order)"
+    )
 
     args = parser.parse_args()
 
@@ -150,7 +232,9 @@ def main():
         show_constraints=args.constraints,
         show_derived=args.derived,
         show_meta=args.meta,
-        show_full=args.full
+        show_full=args.full,
+        limit=args.limit,
+        offset=args.offset
     )
 
 